@@ -0,0 +1,104 @@
+"""
+Recall@k vs. latency of the ANN index modes in index_engine.py against the exact flat baseline.
+
+Uses the vectors of the saved knowledge base when --data-dir points at one, otherwise a
+synthetic clustered set of unit vectors. Run from the repository root:
+    python benchmarks/bench_ann_recall.py --data-dir data
+    python benchmarks/bench_ann_recall.py --vectors 500000 --queries 1000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import faiss
+import numpy as np
+
+import index_engine
+
+
+# <--------------------------------------------------Data------------------------------------->
+def load_corpus_vectors(data_dir):
+    index = faiss.read_index(os.path.join(data_dir, "index.faiss"))
+    return index_engine.reconstruct_all(index)
+
+
+def make_synthetic_vectors(count, dimension, clusters=256, seed=0):
+    """
+    Gaussian blobs on the unit sphere, closer to real sentence embeddings than uniform noise.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimension)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, count)] + 0.35 * rng.standard_normal((count, dimension)).astype(np.float32)
+    return normalize(vectors)
+
+
+def make_queries(vectors, count, seed=1):
+    rng = np.random.default_rng(seed)
+    picked = vectors[rng.choice(len(vectors), count, replace=False)]
+    return normalize(picked + 0.05 * rng.standard_normal(picked.shape).astype(np.float32))
+
+
+def normalize(vectors):
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+# <--------------------------------------------------Measurement------------------------------------->
+def run(index, queries, k, params=None):
+    """
+    Returns (labels, mean latency in ms) for one query at a time, as the Q&A tab issues them.
+    """
+    labels = np.empty((len(queries), k), dtype=np.int64)
+    start = time.perf_counter()
+    for i, query in enumerate(queries):
+        _, labels[i] = index_engine.search(index, query[None, :], k, params)
+    return labels, (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def recall_at_k(labels, truth):
+    hits = sum(len(set(row) & set(expected)) for row, expected in zip(labels, truth))
+    return hits / truth.size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", help="Benchmark the vectors of a saved knowledge base")
+    parser.add_argument("--vectors", type=int, default=200000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.data_dir:
+        vectors = load_corpus_vectors(args.data_dir)
+    else:
+        vectors = make_synthetic_vectors(args.vectors, args.dimension)
+    queries = make_queries(vectors, min(args.queries, len(vectors)))
+    print(f"{len(vectors)} vectors, {len(queries)} queries, k={args.k}\n")
+
+    flat = index_engine.build_index(vectors, "flat", quantization="none")
+    truth, flat_latency = run(flat, queries, args.k)
+
+    print(f"{'index':<8}{'setting':<16}{'build (s)':>10}{'recall@k':>10}{'latency (ms)':>14}{'speed-up':>10}")
+    print(f"{'flat':<8}{'exact':<16}{'-':>10}{1.0:>10.3f}{flat_latency:>14.3f}{1.0:>9.1f}x")
+
+    for kind, knob, settings in [("ivf", "nprobe", [1, 4, 16, 64]), ("hnsw", "efSearch", [16, 32, 64, 128])]:
+        start = time.perf_counter()
+        index = index_engine.build_index(vectors, kind, quantization="none")
+        build_seconds = time.perf_counter() - start
+        for value in settings:
+            if kind == "ivf":
+                params = index_engine.search_parameters(index, nprobe=value)
+            else:
+                params = index_engine.search_parameters(index, ef_search=value)
+            labels, latency = run(index, queries, args.k, params)
+            print(
+                f"{kind:<8}{f'{knob}={value}':<16}{build_seconds:>10.1f}{recall_at_k(labels, truth):>10.3f}"
+                f"{latency:>14.3f}{flat_latency / latency:>9.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Load test of the app's LLM generation paths through the shared gateway: p50/p95/p99 latency,
+throughput and errors per scenario at a given client concurrency.
+
+Scenarios call the same functions the Streamlit tabs use (generation.py): summary and
+highlight stream tokens (time to first token is reported too), quiz, keywords and roadmap
+wait for the full completion, and qa answers questions with QAEngine over a small in-memory
+knowledge base (loads the embedding model). The response cache is not used.
+
+Every request gets a distinct prompt unless --identical is given, which sends the same prompt
+from all clients to measure the gateway's coalescing of identical in-flight requests.
+
+Without --url a fake Ollama server (benchmarks/fake_ollama.py) is started in-process.
+Run from the repository root:
+    python benchmarks/bench_llm_load.py --scenario all --requests 40 --concurrency 8
+    python benchmarks/bench_llm_load.py --url http://127.0.0.1:11434 --scenario summary --llm-concurrency 2
+"""
+import argparse
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+import generation
+from fake_ollama import FakeOllamaServer
+from llm_gateway import GatewayLLM, OllamaGateway
+from streaming import GenerationStats, MeteredStream
+
+
+SCENARIOS = ["summary", "highlight", "quiz", "keywords", "roadmap", "qa"]
+
+SAMPLE_TEXT = (
+    "Machine learning is a field of artificial intelligence that builds models from data. "
+    "Supervised learning trains a model on labelled examples, while unsupervised learning finds structure "
+    "in unlabelled data. Neural networks stack layers of weighted connections and are trained with "
+    "gradient descent and backpropagation. Deep learning uses many such layers and powers modern "
+    "computer vision and natural language processing. Python, with libraries such as NumPy, pandas and "
+    "PyTorch, is the most common language for these workloads. Evaluation relies on held-out test sets, "
+    "cross-validation and metrics such as accuracy, precision and recall."
+)
+
+QUESTIONS = [
+    "What is supervised learning?",
+    "How are neural networks trained?",
+    "Which language is most common for machine learning?",
+    "How are models evaluated?",
+]
+
+
+def percentile(values, p):
+    """
+    Nearest-rank percentile of a list of numbers.
+    """
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def build_qa_engine(llm):
+    """
+    QAEngine over an in-memory knowledge base of SAMPLE_TEXT, built like main.build_qa_engine
+    (without the cross-encoder re-ranker).
+    """
+    from langchain.schema import Document
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+
+    from context_packer import ContextPacker
+    from embeddings import EmbeddingQueue
+    from knowledge_base import KnowledgeBase
+    from qa_engine import QAEngine
+
+    embedding_model = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2", encode_kwargs={"normalize_embeddings": True})
+    knowledge_base = KnowledgeBase(embedding_model)
+    splitter = RecursiveCharacterTextSplitter(chunk_size=200, chunk_overlap=40, add_start_index=True)
+    embedding_queue = EmbeddingQueue(embedding_model)
+    document = Document(page_content=SAMPLE_TEXT, metadata={"name": "sample.txt"})
+    embedding_queue.put(document, splitter.split_documents([document]), "sample")
+    knowledge_base.add_documents(embedding_queue.flush())
+
+    retriever = knowledge_base.as_retriever(k=config.CONTEXT_CANDIDATES)
+    return QAEngine(llm, retriever, packer=ContextPacker())
+
+
+def make_request(scenario, llm, stats, qa_engine=None, identical=False):
+    """
+    Returns a function performing the scenario's i-th request.
+    """
+    def run(i):
+        # A per-request suffix keeps identical prompts from being served by one generation
+        i = 0 if identical else i
+        text = f"{SAMPLE_TEXT} (request {i})"
+        if scenario == "summary":
+            return "".join(MeteredStream(generation.stream_summary_with_llama(text, llm), scenario, stats))
+        if scenario == "highlight":
+            stream = generation.stream_description_with_ollama(f"Python {i}", "MISC", text, llm)
+            return "".join(MeteredStream(stream, scenario, stats))
+        if scenario == "quiz":
+            questions = generation.generate_quiz_questions(text, 5, llm)
+            if not questions:
+                raise ValueError("No quiz questions could be parsed from the response.")
+            return questions
+        if scenario == "keywords":
+            return generation.extract_meaningful_keywords_with_llama(text, 10, llm)
+        if scenario == "roadmap":
+            return generation.parse_and_clean_learning_path(generation.generate_learning_path_with_llama(f"Python {i}", llm))
+        if scenario == "qa":
+            question = f"{QUESTIONS[i % len(QUESTIONS)]} (request {i})"
+            return qa_engine.answer(question)["answer"]
+        raise ValueError(f"Unknown scenario {scenario!r}")
+    return run
+
+
+def run_scenario(request, count, concurrency):
+    """
+    Sends count requests from concurrency threads; returns (latencies, errors, wall seconds).
+    """
+    latencies = []
+    errors = Counter()
+    lock = threading.Lock()
+
+    def timed(i):
+        start = time.perf_counter()
+        try:
+            request(i)
+        except Exception as e:
+            with lock:
+                errors[type(e).__name__] += 1
+            return
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed, range(count)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Ollama (or fake) server to load; default starts a fake one in-process")
+    parser.add_argument("--scenario", choices=SCENARIOS + ["all"], default="all")
+    parser.add_argument("--requests", type=int, default=32, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent client threads")
+    parser.add_argument("--llm-concurrency", type=int, default=config.LLM_MAX_CONCURRENCY, help="Gateway slots")
+    parser.add_argument("--max-waiting", type=int, default=config.LLM_MAX_WAITING)
+    parser.add_argument("--identical", action="store_true", help="Send the same prompt from every client")
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake server: seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0, help="Fake server: tokens/s per request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fake server: fraction of HTTP 500 answers")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        server = FakeOllamaServer(
+            latency=args.latency, tokens_per_second=args.tokens_per_second, error_rate=args.error_rate
+        ).start()
+        url = server.url
+
+    gateway = OllamaGateway(base_url=url, max_concurrency=args.llm_concurrency, max_waiting=args.max_waiting)
+    llm = GatewayLLM(model=config.LLM_MODEL, gateway=gateway, use_cache=False)
+    stats = GenerationStats()
+    scenarios = SCENARIOS if args.scenario == "all" else [args.scenario]
+    qa_engine = build_qa_engine(llm) if "qa" in scenarios else None
+
+    print(
+        f"{url}: {args.requests} requests per scenario, {args.concurrency} clients, "
+        f"{args.llm_concurrency} LLM slots, {args.max_waiting} max waiting\n"
+    )
+    print(f"{'scenario':<11}{'ok':>5}{'errors':>8}{'p50 (s)':>9}{'p95 (s)':>9}{'p99 (s)':>9}{'req/s':>8}{'TTFT (s)':>10}")
+    for scenario in scenarios:
+        request = make_request(scenario, llm, stats, qa_engine, args.identical)
+        latencies, errors, seconds = run_scenario(request, args.requests, args.concurrency)
+        time_to_first_token = stats.summary().get(scenario, {}).get("time_to_first_token")
+        row = f"{scenario:<11}{len(latencies):>5}{sum(errors.values()):>8}"
+        if latencies:
+            row += "".join(f"{percentile(latencies, p):>9.2f}" for p in (50, 95, 99))
+        else:
+            row += f"{'-':>9}" * 3
+        row += f"{len(latencies) / seconds:>8.2f}"
+        row += f"{time_to_first_token:>10.2f}" if time_to_first_token is not None else f"{'-':>10}"
+        print(row)
+        for name, count in errors.items():
+            print(f"{'':<11}{count} x {name}")
+
+    print(f"\nGateway: {gateway.stats()}")
+    if server is not None:
+        print(f"Fake server handled {server.requests} requests")
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
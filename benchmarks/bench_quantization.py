@@ -0,0 +1,88 @@
+"""
+Bytes per vector and recall@k of the quantized storage modes in index_engine.py
+(fp16, int8, PQ, each with and without exact re-scoring) against float32 flat search.
+Re-scoring reads candidates' float32 rows from an on-disk ExactVectorStore, as the knowledge
+base does, so bytes/vec is the index's RAM only.
+
+Uses the vectors of the saved knowledge base when --data-dir points at one, otherwise a
+synthetic clustered set of unit vectors. Run from the repository root:
+    python benchmarks/bench_quantization.py --data-dir data
+    python benchmarks/bench_quantization.py --vectors 200000 --kind ivf
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+import index_engine
+from exact_vectors import ExactVectorStore
+from bench_ann_recall import load_corpus_vectors, make_queries, make_synthetic_vectors, recall_at_k, run
+
+
+def run_rescored(index, queries, k, params, exact_vectors):
+    """
+    Like run, but over-fetches RESCORE_K_FACTOR * k candidates and re-ranks them exactly.
+    """
+    labels = np.empty((len(queries), k), dtype=np.int64)
+    start = time.perf_counter()
+    for i, query in enumerate(queries):
+        _, candidates = index_engine.search(index, query[None, :], k * config.RESCORE_K_FACTOR, params)
+        _, labels[i] = index_engine.rescore(query[None, :], candidates, exact_vectors, k)
+    return labels, (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", help="Benchmark the vectors of a saved knowledge base")
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--kind", choices=["flat", "ivf", "hnsw"], default="flat")
+    args = parser.parse_args()
+
+    if args.data_dir:
+        vectors = load_corpus_vectors(args.data_dir)
+    else:
+        vectors = make_synthetic_vectors(args.vectors, args.dimension)
+    queries = make_queries(vectors, min(args.queries, len(vectors)))
+    print(f"{len(vectors)} vectors, {len(queries)} queries, k={args.k}, {args.kind} index\n")
+
+    flat = index_engine.build_index(vectors, "flat", quantization="none")
+    truth, flat_latency = run(flat, queries, args.k)
+    flat_bytes = index_engine.bytes_per_vector(flat)
+
+    print(f"{'storage':<10}{'re-score':<10}{'bytes/vec':>10}{'ratio':>8}{'build (s)':>10}{'recall@k':>10}{'latency (ms)':>14}")
+    print(f"{'float32':<10}{'-':<10}{flat_bytes:>10}{1.0:>7.1f}x{'-':>10}{1.0:>10.3f}{flat_latency:>14.3f}")
+
+    exact_vectors = ExactVectorStore(vectors.shape[1])
+    exact_vectors.append(vectors)
+    for quantization in ["none", "fp16", "int8", "pq"]:
+        if quantization == "none" and args.kind == "flat":
+            continue
+        start = time.perf_counter()
+        index = index_engine.build_index(vectors, args.kind, quantization=quantization)
+        build_seconds = time.perf_counter() - start
+        size = index_engine.bytes_per_vector(index)
+        for rescore in [False, True]:
+            if quantization == "none" and rescore:
+                continue
+            params = index_engine.search_parameters(index)
+            if rescore:
+                labels, latency = run_rescored(index, queries, args.k, params, exact_vectors)
+            else:
+                labels, latency = run(index, queries, args.k, params)
+            print(
+                f"{quantization:<10}{'yes' if rescore else 'no':<10}{size:>10}{flat_bytes / size:>7.1f}x"
+                f"{build_seconds:>10.1f}{recall_at_k(labels, truth):>10.3f}{latency:>14.3f}"
+            )
+    exact_vectors.close()
+
+
+if __name__ == "__main__":
+    main()
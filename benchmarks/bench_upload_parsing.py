@@ -0,0 +1,164 @@
+"""
+Benchmarks two upload-parsing changes in extraction.py, each on its own:
+  1. in-memory parsing: the same parsers reading the upload's buffer directly versus the old
+     path that copied each upload to a temp file and read it back;
+  2. XLSX streaming: row groups from openpyxl's read-only mode versus pandas.read_excel of
+     the whole sheet, both from memory, with time and peak Python memory.
+The PDF fixture has real text on every page, so text extraction is measured.
+
+Run from the repository root:
+    python benchmarks/bench_upload_parsing.py --txt-mb 50 --rows 200000 --slides 500 --pages 1500
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from pptx import Presentation
+from pptx.util import Inches
+from pypdf import PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+from extraction import BufferReader, extract_document, iter_xlsx_sections
+
+
+# <--------------------------------------------------Synthetic uploads------------------------------------->
+def make_txt(megabytes):
+    line = "Employees must complete the security awareness module before accessing client systems.\n"
+    return (line * (megabytes * 1024 * 1024 // len(line))).encode("utf-8")
+
+
+def make_xlsx(rows):
+    frame = pd.DataFrame({
+        "Employee ID": range(rows),
+        "Name": [f"Employee {i}" for i in range(rows)],
+        "Department": ["Operations", "Finance", "Engineering", "Sales"] * (rows // 4) + ["HR"] * (rows % 4),
+        "Course": "Security Awareness",
+        "Score": [i % 100 for i in range(rows)],
+    })
+    buffer = io.BytesIO()
+    frame.to_excel(buffer, index=False, engine="xlsxwriter")
+    return buffer.getvalue()
+
+
+def make_pptx(slides):
+    presentation = Presentation()
+    layout = presentation.slide_layouts[6]
+    for i in range(slides):
+        slide = presentation.slides.add_slide(layout)
+        box = slide.shapes.add_textbox(Inches(1), Inches(1), Inches(8), Inches(5))
+        box.text_frame.text = f"Slide {i}: onboarding checklist, escalation paths and compliance contacts."
+    buffer = io.BytesIO()
+    presentation.save(buffer)
+    return buffer.getvalue()
+
+
+def make_pdf(pages, lines_per_page=45):
+    """
+    A text PDF: every page carries lines_per_page lines of Helvetica text, like a policy manual.
+    """
+    font = DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    })
+    writer = PdfWriter()
+    for page_number in range(pages):
+        page = writer.add_blank_page(width=612, height=792)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font}),
+        })
+        lines = [
+            f"({page_number}.{line} Employees must complete the security awareness module before accessing client systems.) '"
+            for line in range(lines_per_page)
+        ]
+        content = DecodedStreamObject()
+        content.set_data(("BT /F1 10 Tf 14 TL 40 760 Td\n" + "\n".join(lines) + "\nET").encode("latin-1"))
+        page.replace_contents(content)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+# <--------------------------------------------------Legacy temp-file path------------------------------------->
+def extract_via_temp_file(name, data):
+    """
+    The pre-extraction-layer behaviour: copy the upload to disk and parse it back from the file,
+    here with the current parsers so only the temp-file round trip differs.
+    """
+    with tempfile.NamedTemporaryFile(delete=False) as temp_file:
+        temp_file.write(data)
+        temp_file_path = temp_file.name
+    try:
+        with open(temp_file_path, "rb") as file:
+            return extract_document(name, file.read())
+    finally:
+        os.remove(temp_file_path)
+
+
+# <--------------------------------------------------XLSX parsers------------------------------------->
+def xlsx_with_pandas(data):
+    return pd.read_excel(BufferReader(data)).to_string(index=False)
+
+
+def xlsx_streaming(data):
+    return list(iter_xlsx_sections("roster.xlsx", BufferReader(data)))
+
+
+# <--------------------------------------------------Runner------------------------------------->
+def best_of(repeat, func, *args):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def peak_mb(func, *args):
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--txt-mb", type=int, default=50)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--slides", type=int, default=300)
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    uploads = [
+        ("large.txt", make_txt(args.txt_mb)),
+        ("roster.xlsx", make_xlsx(args.rows)),
+        ("deck.pptx", make_pptx(args.slides)),
+        ("manual.pdf", make_pdf(args.pages)),
+    ]
+
+    print("1. Temp file vs in-memory parsing (same parsers)")
+    print(f"{'file':<14}{'size (MB)':>11}{'temp file (s)':>15}{'in-memory (s)':>15}{'speed-up':>10}")
+    for name, data in uploads:
+        legacy = best_of(args.repeat, extract_via_temp_file, name, data)
+        in_memory = best_of(args.repeat, extract_document, name, memoryview(data))
+        print(f"{name:<14}{len(data) / 1e6:>11.1f}{legacy:>15.3f}{in_memory:>15.3f}{legacy / in_memory:>9.2f}x")
+
+    xlsx = dict(uploads)["roster.xlsx"]
+    print(f"\n2. XLSX: pandas.read_excel vs streaming row groups ({args.rows} rows, from memory)")
+    print(f"{'parser':<14}{'time (s)':>11}{'peak (MB)':>11}")
+    for label, parse in [("pandas", xlsx_with_pandas), ("streaming", xlsx_streaming)]:
+        print(f"{label:<14}{best_of(args.repeat, parse, xlsx):>11.3f}{peak_mb(parse, xlsx):>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
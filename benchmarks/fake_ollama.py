@@ -0,0 +1,261 @@
+"""
+Stand-in for a local Ollama server, for benchmarking and testing the generation paths without
+a real llama3.2. Speaks POST /api/generate like Ollama does: NDJSON token streaming with
+"stream": true (the default), a single JSON object with "stream": false.
+
+Each response waits --latency seconds before its first token (prompt evaluation) and then
+produces --tokens-per-second. Responses are templated on the prompt so the app's parsers work:
+quiz prompts get "Question n: ... Answer: X" blocks, roadmap prompts get Beginner/Intermediate/
+Advanced lines, keyword prompts a comma-separated list. --responses takes a JSON object of
+{"prompt substring": "canned response"} checked before the templates.
+
+Run from the repository root, then point the app at it:
+    python benchmarks/fake_ollama.py --port 11435 --latency 0.5 --tokens-per-second 40
+    KHIA_OLLAMA_URL=http://127.0.0.1:11435 streamlit run main.py
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+TOPICS = ["Python", "Machine Learning", "Deep Learning", "Statistics", "Linear Algebra",
+          "Data Visualization", "SQL", "Neural Networks", "Natural Language Processing", "Cloud Computing"]
+
+
+# <--------------------------------------------------Templated responses------------------------------------->
+def quiz_response(prompt):
+    match = re.search(r"Generate (\d+) multiple-choice", prompt)
+    count = int(match.group(1)) if match else 5
+    blocks = []
+    for number in range(1, count + 1):
+        topic = TOPICS[(number - 1) % len(TOPICS)]
+        answer = "ABCD"[number % 4]
+        blocks.append(
+            f"Question {number}: Which statement about {topic} is made in the text?\n"
+            "Choices:\n"
+            f"A) {topic} is introduced as a core concept\n"
+            f"B) {topic} is mentioned only in passing\n"
+            f"C) {topic} is described as obsolete\n"
+            f"D) {topic} is not covered\n"
+            f"Answer: {answer}"
+        )
+    return "\n\n".join(blocks)
+
+
+def roadmap_response(prompt):
+    match = re.search(r"for the topic '(.+?)'", prompt)
+    topic = match.group(1) if match else "the topic"
+    return (
+        f"Beginner: Introduction to {topic}, Core Terminology, Basic Tools\n"
+        f"Intermediate: Applied {topic}, Common Patterns, Hands-on Projects\n"
+        f"Advanced: {topic} Research, Performance Tuning, System Design"
+    )
+
+
+def keywords_response(prompt):
+    match = re.search(r"up to (\d+)", prompt)
+    count = int(match.group(1)) if match else 10
+    return ", ".join(TOPICS[:count])
+
+
+def entity_response(prompt):
+    match = re.search(r"Entity: (.+?) \((\w+)\)", prompt)
+    entity, kind = match.groups() if match else ("The entity", "MISC")
+    return f"{entity} is a {kind.lower()} mentioned in the document as relevant to its main subject."
+
+
+def summary_response(prompt):
+    words = prompt.split()
+    excerpt = " ".join(words[6:46]) if len(words) > 6 else "the provided text"
+    return (
+        "The text discusses several connected ideas. "
+        f"It begins with: {excerpt}. "
+        "Overall, it explains the key concepts, gives examples, and closes with practical takeaways."
+    )
+
+
+def default_response(prompt):
+    return (
+        "Based on the provided context, the answer is that the document describes this topic in detail, "
+        "highlighting its main components, how they relate to each other, and why they matter in practice."
+    )
+
+
+TEMPLATES = [
+    ("multiple-choice quiz", quiz_response),
+    ("learning roadmap", roadmap_response),
+    ("course topics", keywords_response),
+    ("Entity:", entity_response),
+    ("summarize", summary_response),
+]
+
+
+def render_response(prompt, canned=None):
+    """
+    Returns the response text for a prompt: a canned response whose key occurs in the prompt,
+    else the first matching template, else a generic answer.
+    """
+    for key, response in (canned or {}).items():
+        if key in prompt:
+            return response
+    for key, template in TEMPLATES:
+        if key.lower() in prompt.lower():
+            return template(prompt)
+    return default_response(prompt)
+
+
+def split_tokens(text):
+    """
+    Splits text into word-sized pieces that keep their trailing whitespace, like Ollama's tokens.
+    """
+    return re.findall(r"\S+\s*|\s+", text)
+
+
+# <--------------------------------------------------Server------------------------------------->
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        if self.path in ("/", "/api/version"):
+            self._send_json({"version": "0.0.0-fake"} if self.path == "/api/version" else {"status": "Ollama is running"})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path != "/api/generate":
+            self._send_json({"error": "not found"}, status=404)
+            return
+        try:
+            request = json.loads(body or b"{}")
+        except json.JSONDecodeError:
+            self._send_json({"error": "invalid JSON body"}, status=400)
+            return
+
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            fail = random.random() < server.error_rate
+        if fail:
+            self._send_json({"error": "injected failure"}, status=500)
+            return
+
+        model = request.get("model", "llama3.2")
+        tokens = split_tokens(render_response(request.get("prompt", ""), server.canned))
+        time.sleep(server.latency)
+        if request.get("stream", True):
+            self._stream(model, tokens)
+        else:
+            time.sleep(len(tokens) * server.seconds_per_token)
+            self._send_json(self._message(model, "".join(tokens), True, len(tokens)))
+
+    def _stream(self, model, tokens):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for token in tokens:
+                self._write_chunk(self._message(model, token, False))
+                time.sleep(self.server.seconds_per_token)
+            self._write_chunk(self._message(model, "", True, len(tokens)))
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client cancelled the stream
+            self.close_connection = True
+
+    def _write_chunk(self, message):
+        line = json.dumps(message).encode("utf-8") + b"\n"
+        self.wfile.write(f"{len(line):x}\r\n".encode("ascii") + line + b"\r\n")
+        self.wfile.flush()
+
+    def _message(self, model, text, done, eval_count=None):
+        message = {"model": model, "created_at": datetime.now(timezone.utc).isoformat(), "response": text, "done": done}
+        if done:
+            message["done_reason"] = "stop"
+            message["eval_count"] = eval_count
+        return message
+
+    def _send_json(self, message, status=200):
+        body = json.dumps(message).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    """
+    The fake server; usable in-process with start() and stop(). port=0 picks a free port.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.2, tokens_per_second=50.0, canned=None,
+                 error_rate=0.0, verbose=False):
+        super().__init__((host, port), FakeOllamaHandler)
+        self.latency = latency
+        self.seconds_per_token = 1.0 / tokens_per_second if tokens_per_second > 0 else 0.0
+        self.canned = canned or {}
+        self.error_rate = error_rate
+        self.verbose = verbose
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, name="fake-ollama", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0, help="0 for no delay between tokens")
+    parser.add_argument("--responses", help="JSON file of {prompt substring: response} overrides")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    canned = None
+    if args.responses:
+        with open(args.responses, encoding="utf-8") as f:
+            canned = json.load(f)
+
+    server = FakeOllamaServer(
+        args.host, args.port, args.latency, args.tokens_per_second, canned, args.error_rate, args.verbose
+    )
+    print(f"Fake Ollama listening on {server.url} ({args.latency}s latency, {args.tokens_per_second} tokens/s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
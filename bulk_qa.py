@@ -0,0 +1,79 @@
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import config
+
+
+def read_questions(name, data):
+    """
+    Reads the questions from an uploaded CSV or XLSX file: the column named "question"
+    (any case) if there is one, otherwise the first column. Blank rows are skipped.
+    """
+    if name.lower().endswith(".xlsx"):
+        table = pd.read_excel(io.BytesIO(data))
+    else:
+        table = pd.read_csv(io.BytesIO(data))
+    columns = {str(column).strip().lower(): column for column in table.columns}
+    column = columns.get("question", table.columns[0])
+    questions = table[column].dropna().astype(str).str.strip()
+    return [question for question in questions if question]
+
+
+def answer_questions(knowledge_base, qa_engine, questions, reranker=None, k=3, max_workers=None, on_answer=None):
+    """
+    Answers many standalone questions at once and returns a table of answers, sources and
+    latencies. All questions are embedded in one batch, searched with one FAISS call and
+    re-ranked with one cross-encoder batch; the LLM calls then run on a bounded thread pool
+    so Ollama sees at most BULK_QA_CONCURRENCY requests at a time.
+
+    A question's latency is its share of the batched embedding, search and re-ranking plus
+    its own generation time. on_answer(done, total) reports progress in question order.
+    """
+    start = time.perf_counter()
+    query_vectors = knowledge_base.embedding_model.embed_documents(questions)
+    candidates = max(k, config.RERANK_CANDIDATES) if reranker is not None else k
+    contexts = knowledge_base.hybrid_search_many(questions, query_vectors, candidates)
+    if reranker is not None:
+        # Per-question calls from the pool would mostly be skipped by the latency budget
+        contexts = reranker.rerank_many(questions, contexts, k)
+    retrieval_seconds = (time.perf_counter() - start) / max(len(questions), 1)
+
+    def answer(question, context):
+        started = time.perf_counter()
+        try:
+            if not context:
+                answer_text = "No relevant documents found for your question."
+            else:
+                answer_text = qa_engine.generate(question, context)
+        except Exception as e:
+            answer_text = f"An error occurred while processing your question: {str(e)}"
+        return {
+            "Question": question,
+            "Answer": answer_text,
+            "Sources": "; ".join(dict.fromkeys(describe_source(document) for document in context)),
+            "Latency (s)": round(retrieval_seconds + time.perf_counter() - started, 2),
+        }
+
+    rows = []
+    with ThreadPoolExecutor(max_workers=max_workers or config.BULK_QA_CONCURRENCY) as pool:
+        futures = [pool.submit(answer, question, context) for question, context in zip(questions, contexts)]
+        for done, future in enumerate(futures, start=1):
+            rows.append(future.result())
+            if on_answer is not None:
+                on_answer(done, len(futures))
+    return pd.DataFrame(rows, columns=["Question", "Answer", "Sources", "Latency (s)"])
+
+
+def describe_source(document):
+    """
+    Returns "name", "name p. 3" or "name (Sheet1)" for a retrieved chunk.
+    """
+    metadata = document.metadata
+    if "page" in metadata:
+        return f"{metadata['name']} p. {metadata['page']}"
+    if "sheet" in metadata:
+        return f"{metadata['name']} ({metadata['sheet']})"
+    return metadata.get("name", "")
@@ -0,0 +1,144 @@
+"""
+Tunable settings for the Knowledge Hub. Every value can be overridden with an environment variable.
+"""
+import os
+
+
+# Directory holding the persisted FAISS index, docstore and ingestion ledger
+DATA_DIR = os.environ.get("KHIA_DATA_DIR", "data")
+
+
+# Workspace used when none is picked; it keeps its index directly in DATA_DIR
+DEFAULT_WORKSPACE = os.environ.get("KHIA_DEFAULT_WORKSPACE", "default")
+
+# Estimated memory the loaded workspaces may use before least recently queried ones are unloaded
+WORKSPACE_MEMORY_BUDGET_BYTES = int(os.environ.get("KHIA_WORKSPACE_MEMORY_MB", 2048)) * 1024 * 1024
+
+
+# <--------------------------------------------------Ingestion------------------------------------->
+# Number of worker processes used to parse uploads in parallel (1 disables the pool)
+EXTRACT_WORKERS = int(os.environ.get("KHIA_EXTRACT_WORKERS", min(4, os.cpu_count() or 1)))
+
+# PDFs at least this large are parsed, split and embedded page by page to keep memory flat
+PDF_STREAMING_MIN_BYTES = int(os.environ.get("KHIA_PDF_STREAMING_MIN_BYTES", 10 * 1024 * 1024))
+
+# Number of chunks embedded and added to FAISS per flush when streaming
+STREAMING_FLUSH_CHUNKS = int(os.environ.get("KHIA_STREAMING_FLUSH_CHUNKS", 512))
+
+# PDFs up to this size are parsed from memory; larger ones are spooled to an anonymous temp file
+PDF_SPOOL_MAX_BYTES = int(os.environ.get("KHIA_PDF_SPOOL_MAX_BYTES", 32 * 1024 * 1024))
+
+# Maximum characters per spreadsheet row group; kept at the splitter's chunk size so each group is one chunk
+XLSX_CHUNK_CHARS = int(os.environ.get("KHIA_XLSX_CHUNK_CHARS", 1000))
+
+# A failed upload is retried automatically after INGEST_RETRY_SECONDS, doubling per attempt,
+# up to INGEST_MAX_ATTEMPTS attempts; after that only an explicit retry in the UI re-submits it
+INGEST_RETRY_SECONDS = float(os.environ.get("KHIA_INGEST_RETRY_SECONDS", 30))
+INGEST_MAX_ATTEMPTS = int(os.environ.get("KHIA_INGEST_MAX_ATTEMPTS", 3))
+
+# <--------------------------------------------------Embedding------------------------------------->
+# Chunks per SentenceTransformer forward pass; larger batches amortise overhead across files
+EMBED_BATCH_SIZE = int(os.environ.get("KHIA_EMBED_BATCH_SIZE", 128))
+
+# Size limit of the on-disk chunk embedding cache; least recently used vectors are evicted beyond it
+EMBEDDING_CACHE_MAX_BYTES = int(os.environ.get("KHIA_EMBEDDING_CACHE_MAX_MB", 512)) * 1024 * 1024
+
+
+# <--------------------------------------------------Index maintenance------------------------------------->
+# Deleted/replaced chunks are tombstoned; the index is compacted once they reach this share of it...
+COMPACT_TOMBSTONE_RATIO = float(os.environ.get("KHIA_COMPACT_TOMBSTONE_RATIO", 0.1))
+
+# ...and at least this many, so small indexes are not rebuilt on every replacement
+COMPACT_MIN_TOMBSTONES = int(os.environ.get("KHIA_COMPACT_MIN_TOMBSTONES", 256))
+
+# Index a flat (exact) index is promoted to once it holds ANN_PROMOTE_THRESHOLD vectors: "ivf", "hnsw" or "flat" to never promote
+ANN_INDEX_TYPE = os.environ.get("KHIA_ANN_INDEX_TYPE", "ivf")
+ANN_PROMOTE_THRESHOLD = int(os.environ.get("KHIA_ANN_PROMOTE_THRESHOLD", 200000))
+
+# IVF: number of lists (0 picks 4 * sqrt(n)), training sample size and lists probed per query
+IVF_NLIST = int(os.environ.get("KHIA_IVF_NLIST", 0))
+IVF_TRAIN_SAMPLE = int(os.environ.get("KHIA_IVF_TRAIN_SAMPLE", 100000))
+IVF_NPROBE = int(os.environ.get("KHIA_IVF_NPROBE", 16))
+
+# HNSW: graph degree, build-time and query-time beam widths
+HNSW_M = int(os.environ.get("KHIA_HNSW_M", 32))
+HNSW_EF_CONSTRUCTION = int(os.environ.get("KHIA_HNSW_EF_CONSTRUCTION", 200))
+HNSW_EF_SEARCH = int(os.environ.get("KHIA_HNSW_EF_SEARCH", 64))
+
+# Vector storage: "none" (float32), "fp16", "int8" (scalar quantization) or "pq" (product quantization).
+# A flat float32 index is converted once it holds QUANTIZE_MIN_VECTORS vectors (enough to train on)
+VECTOR_QUANTIZATION = os.environ.get("KHIA_VECTOR_QUANTIZATION", "none")
+QUANTIZE_MIN_VECTORS = int(os.environ.get("KHIA_QUANTIZE_MIN_VECTORS", 20000))
+
+# PQ: sub-quantizers per vector (must divide the embedding dimension), 8 bits each
+PQ_M = int(os.environ.get("KHIA_PQ_M", 48))
+
+# Re-score RESCORE_K_FACTOR * k quantized candidates with the exact float32 vectors kept on disk
+RESCORE = os.environ.get("KHIA_RESCORE", "0") == "1"
+RESCORE_K_FACTOR = int(os.environ.get("KHIA_RESCORE_K_FACTOR", 4))
+
+
+# <--------------------------------------------------Retrieval------------------------------------->
+# Hybrid retrieval: dense and BM25 candidates per query, fused with weighted reciprocal rank fusion
+# (score = weight / (RRF_K + rank)); a lexical weight of 0 falls back to dense-only search
+HYBRID_CANDIDATES = int(os.environ.get("KHIA_HYBRID_CANDIDATES", 20))
+HYBRID_VECTOR_WEIGHT = float(os.environ.get("KHIA_HYBRID_VECTOR_WEIGHT", 1.0))
+HYBRID_LEXICAL_WEIGHT = float(os.environ.get("KHIA_HYBRID_LEXICAL_WEIGHT", 1.0))
+RRF_K = int(os.environ.get("KHIA_RRF_K", 60))
+
+# Cross-encoder re-ranking: RERANK_CANDIDATES hybrid hits are scored in batches and the best k kept.
+# Re-ranking is skipped when its estimated time under the current load exceeds RERANK_BUDGET_MS (0 = never skip)
+RERANK_MODEL = os.environ.get("KHIA_RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.environ.get("KHIA_RERANK_CANDIDATES", 30))
+RERANK_BATCH_SIZE = int(os.environ.get("KHIA_RERANK_BATCH_SIZE", 32))
+RERANK_BUDGET_MS = int(os.environ.get("KHIA_RERANK_BUDGET_MS", 300))
+RERANK_CACHE_SIZE = int(os.environ.get("KHIA_RERANK_CACHE_SIZE", 20000))
+
+# Question/answer turns of a session's conversation kept for follow-up questions
+QA_HISTORY_TURNS = int(os.environ.get("KHIA_QA_HISTORY_TURNS", 6))
+
+# Context packing: re-ranked chunks considered per question, and the token budget they are packed into
+# (measured with CONTEXT_TOKENIZER, or ~4 characters per token when it cannot be loaded)
+CONTEXT_CANDIDATES = int(os.environ.get("KHIA_CONTEXT_CANDIDATES", 8))
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("KHIA_CONTEXT_TOKEN_BUDGET", 1500))
+CONTEXT_TOKENIZER = os.environ.get("KHIA_CONTEXT_TOKENIZER", "unsloth/Llama-3.2-1B-Instruct")
+
+# Concurrent LLM calls when answering an uploaded list of questions
+BULK_QA_CONCURRENCY = int(os.environ.get("KHIA_BULK_QA_CONCURRENCY", 4))
+
+
+# <--------------------------------------------------Query caches------------------------------------->
+# Normalised question text -> embedding entries kept in the query embedding LRU
+QUERY_EMBEDDING_CACHE_SIZE = int(os.environ.get("KHIA_QUERY_EMBEDDING_CACHE_SIZE", 4096))
+
+# A cached answer is reused for a new question at least this cosine-similar, while the corpus is unchanged
+ANSWER_CACHE_THRESHOLD = float(os.environ.get("KHIA_ANSWER_CACHE_THRESHOLD", 0.95))
+ANSWER_CACHE_SIZE = int(os.environ.get("KHIA_ANSWER_CACHE_SIZE", 2048))
+
+
+# <--------------------------------------------------LLM gateway------------------------------------->
+# Ollama server and the model the app generates with
+OLLAMA_BASE_URL = os.environ.get("KHIA_OLLAMA_URL", "http://localhost:11434")
+LLM_MODEL = os.environ.get("KHIA_LLM_MODEL", "llama3.2")
+
+# How long Ollama keeps the model loaded after a request
+OLLAMA_KEEP_ALIVE = os.environ.get("KHIA_OLLAMA_KEEP_ALIVE", "30m")
+
+# Requests sent to Ollama at once; match the server's OLLAMA_NUM_PARALLEL
+LLM_MAX_CONCURRENCY = int(os.environ.get("KHIA_LLM_MAX_CONCURRENCY", 2))
+
+# Back-pressure: at most LLM_MAX_WAITING requests queue for a slot, each for at most LLM_QUEUE_TIMEOUT seconds
+LLM_MAX_WAITING = int(os.environ.get("KHIA_LLM_MAX_WAITING", 32))
+LLM_QUEUE_TIMEOUT = float(os.environ.get("KHIA_LLM_QUEUE_TIMEOUT", 120))
+
+# Connect timeout, and the longest wait for a response or the next streamed token
+LLM_CONNECT_TIMEOUT = float(os.environ.get("KHIA_LLM_CONNECT_TIMEOUT", 5))
+LLM_REQUEST_TIMEOUT = float(os.environ.get("KHIA_LLM_REQUEST_TIMEOUT", 300))
+
+# Concurrent identical requests (same model, prompt and options) share one generation; KHIA_LLM_COALESCE=0 turns it off
+LLM_COALESCE = os.environ.get("KHIA_LLM_COALESCE", "1") == "1"
+
+# Persistent LLM response cache keyed by (model, prompt, options); KHIA_LLM_CACHE=0 turns it off
+LLM_CACHE_ENABLED = os.environ.get("KHIA_LLM_CACHE", "1") == "1"
+LLM_CACHE_TTL = int(os.environ.get("KHIA_LLM_CACHE_TTL_HOURS", 7 * 24)) * 3600
+LLM_CACHE_MAX_BYTES = int(os.environ.get("KHIA_LLM_CACHE_MAX_MB", 256)) * 1024 * 1024
@@ -0,0 +1,180 @@
+import re
+import threading
+
+from langchain.schema import Document
+
+import config
+
+
+# Shortest overlap, in characters, treated as two chunks continuing each other rather than a coincidence
+MIN_OVERLAP_CHARS = 20
+
+# Sentences shorter than this (headings, table headers) are never dropped as duplicates
+MIN_DUPLICATE_CHARS = 40
+
+SENTENCE_BOUNDARY = re.compile(r"((?<=[.!?])\s+|\n+)")
+
+
+# <--------------------------------------------------Token counting------------------------------------->
+class TokenCounter:
+    """
+    Counts tokens with the answering model's tokenizer, loaded lazily from Hugging Face. If it
+    cannot be loaded (offline, gated), falls back to the usual estimate of ~4 characters per token.
+    """
+
+    def __init__(self, tokenizer_name=None):
+        self.tokenizer_name = tokenizer_name or config.CONTEXT_TOKENIZER
+        self.tokenizer = None
+        self.loaded = False
+        self.lock = threading.Lock()
+
+    def __call__(self, text):
+        tokenizer = self._load()
+        if tokenizer is None:
+            return max(1, len(text) // 4)
+        return len(tokenizer.encode(text, add_special_tokens=False))
+
+    def _load(self):
+        with self.lock:
+            if not self.loaded:
+                self.loaded = True
+                try:
+                    from transformers import AutoTokenizer
+                    self.tokenizer = AutoTokenizer.from_pretrained(self.tokenizer_name)
+                except Exception:
+                    self.tokenizer = None
+            return self.tokenizer
+
+
+# <--------------------------------------------------Packing------------------------------------->
+class ContextPacker:
+    """
+    Turns relevance-ordered chunks into the context for the answer prompt:
+      1. chunks of the same document section (page, or sheet row group) that overlap or touch are merged,
+         so the splitter's 200-character overlaps are sent once;
+      2. sentences already present in a more relevant span are dropped;
+      3. spans are added greedily by relevance while they fit the token budget.
+    """
+
+    def __init__(self, budget_tokens=None, token_counter=None):
+        self.budget_tokens = budget_tokens or config.CONTEXT_TOKEN_BUDGET
+        self.count_tokens = token_counter or TokenCounter()
+
+    def pack(self, documents):
+        """
+        Returns the packed context as Documents, most relevant first.
+        """
+        spans = self._merge(documents)
+        seen = set()
+        packed = []
+        remaining = self.budget_tokens
+        for document in spans:
+            text = self._drop_seen_sentences(document.page_content, seen)
+            if not text:
+                continue
+            tokens = self.count_tokens(text)
+            if tokens > remaining:
+                # Never send an empty context: cut the most relevant span down to the budget
+                if not packed:
+                    packed.append(Document(page_content=self._truncate(text, remaining), metadata=document.metadata))
+                    break
+                continue
+            packed.append(Document(page_content=text, metadata=document.metadata))
+            remaining -= tokens
+        return packed
+
+    def _merge(self, documents):
+        """
+        Merges overlapping or adjacent chunks of the same document section. A merged span keeps
+        the relevance rank of its best chunk.
+        """
+        groups = {}
+        for rank, document in enumerate(documents):
+            metadata = document.metadata
+            # start_index counts from the start of the section: each spreadsheet row group is its own
+            key = (metadata.get("name"), metadata.get("page"), metadata.get("sheet"), metadata.get("row_start"))
+            groups.setdefault(key, []).append((rank, document))
+
+        spans = []
+        for members in groups.values():
+            if all("start_index" in document.metadata for _, document in members):
+                members.sort(key=lambda member: member[1].metadata["start_index"])
+                merged = self._merge_by_offsets(members)
+            else:
+                merged = self._merge_by_text(members)
+            spans.extend(merged)
+        spans.sort(key=lambda span: span[0])
+        return [document for _, document in spans]
+
+    @staticmethod
+    def _merge_by_offsets(members):
+        spans = []
+        for rank, document in members:
+            start = document.metadata["start_index"]
+            if spans:
+                best_rank, current, current_start = spans[-1]
+                current_end = current_start + len(current.page_content)
+                if start <= current_end:
+                    text = current.page_content + document.page_content[current_end - start:]
+                    spans[-1] = (min(best_rank, rank), Document(page_content=text, metadata=current.metadata), current_start)
+                    continue
+            spans.append((rank, document, start))
+        return [(rank, document) for rank, document, _ in spans]
+
+    @staticmethod
+    def _merge_by_text(members):
+        """
+        Fallback for chunks indexed without offsets: merges a chunk into another when one
+        contains the other or one ends with the start of the other.
+        """
+        spans = []
+        for rank, document in members:
+            text = document.page_content
+            for i, (span_rank, span) in enumerate(spans):
+                merged = _join_overlapping(span.page_content, text)
+                if merged is not None:
+                    spans[i] = (min(span_rank, rank), Document(page_content=merged, metadata=span.metadata))
+                    break
+            else:
+                spans.append((rank, document))
+        return spans
+
+    @staticmethod
+    def _drop_seen_sentences(text, seen):
+        # Odd items are the separators, kept so line breaks (e.g. spreadsheet rows) survive
+        pieces = SENTENCE_BOUNDARY.split(text)
+        kept = []
+        for i in range(0, len(pieces), 2):
+            key = " ".join(pieces[i].split()).lower()
+            if len(key) >= MIN_DUPLICATE_CHARS:
+                if key in seen:
+                    continue
+                seen.add(key)
+            kept.append(pieces[i] + (pieces[i + 1] if i + 1 < len(pieces) else ""))
+        return "".join(kept).strip()
+
+    def _truncate(self, text, budget):
+        # Proportional cut, then trim until it fits
+        text = text[:max(1, len(text) * budget // max(self.count_tokens(text), 1))]
+        while len(text) > 1 and self.count_tokens(text) > budget:
+            text = text[:int(len(text) * 0.9)]
+        return text
+
+
+def _join_overlapping(first, second):
+    """
+    Returns first and second joined over their shared overlap, or None if they do not overlap.
+    """
+    if second in first:
+        return first
+    if first in second:
+        return second
+    for a, b in ((first, second), (second, first)):
+        # Candidate overlaps start wherever b's opening characters occur near the end of a
+        head = b[:MIN_OVERLAP_CHARS]
+        position = a.find(head, max(0, len(a) - len(b)))
+        while position != -1:
+            if b.startswith(a[position:]):
+                return a + b[len(a) - position:]
+            position = a.find(head, position + 1)
+    return None
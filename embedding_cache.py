@@ -0,0 +1,105 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+
+# <--------------------------------------------------Chunk embedding cache------------------------------------->
+class EmbeddingCache:
+    """
+    Persistent SQLite cache of chunk vectors keyed by hash(model name + chunk text), so
+    re-ingesting a revised or duplicate document only encodes the chunks that changed.
+    Least recently used entries are evicted once the stored vectors exceed max_bytes.
+    """
+
+    # SQLite limits the number of bound parameters per statement
+    QUERY_BATCH = 500
+
+    def __init__(self, path, model_name, max_bytes):
+        self.model_name = model_name
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self.connection.commit()
+
+    def key(self, text):
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, texts):
+        """
+        Returns a vector (list of floats) or None for every text, in order.
+        """
+        keys = [self.key(text) for text in texts]
+        found = {}
+        with self.lock:
+            for start in range(0, len(keys), self.QUERY_BATCH):
+                batch = keys[start:start + self.QUERY_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self.connection.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                found.update(rows)
+                if rows:
+                    self.connection.execute(
+                        f"UPDATE embeddings SET last_used = ? WHERE key IN ({','.join('?' * len(rows))})",
+                        [time.time()] + [row[0] for row in rows],
+                    )
+            self.connection.commit()
+
+            vectors = [found.get(key) for key in keys]
+            hits = sum(vector is not None for vector in vectors)
+            self.hits += hits
+            self.misses += len(keys) - hits
+
+        return [None if blob is None else np.frombuffer(blob, dtype=np.float32).tolist() for blob in vectors]
+
+    def put_many(self, texts, vectors):
+        """
+        Stores freshly computed vectors and evicts old ones if the cache grew past max_bytes.
+        """
+        now = time.time()
+        rows = []
+        for text, vector in zip(texts, vectors):
+            blob = np.asarray(vector, dtype=np.float32).tobytes()
+            rows.append((self.key(text), blob, len(blob), now))
+        with self.lock:
+            self.connection.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+            self.connection.commit()
+            self._evict()
+
+    def _evict(self):
+        total = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+        while total > self.max_bytes:
+            rows = self.connection.execute(
+                "SELECT key, size FROM embeddings ORDER BY last_used LIMIT ?", (self.QUERY_BATCH,)
+            ).fetchall()
+            if not rows:
+                break
+            victims = []
+            for key, size in rows:
+                victims.append((key,))
+                total -= size
+                if total <= self.max_bytes:
+                    break
+            self.connection.executemany("DELETE FROM embeddings WHERE key = ?", victims)
+        self.connection.commit()
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def size_bytes(self):
+        with self.lock:
+            return self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
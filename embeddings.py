@@ -0,0 +1,93 @@
+import time
+from collections import namedtuple
+
+import config
+
+
+# A parsed document waiting for (or done with) embedding
+PendingDocument = namedtuple("PendingDocument", ["document", "chunks", "digest", "vectors"])
+
+
+# <--------------------------------------------------Batched embedding------------------------------------->
+def encode_texts(embedding_model, texts, batch_size=None):
+    """
+    Encodes texts with the model's SentenceTransformer in large batches and returns unit-length vectors.
+    """
+    if not texts:
+        return []
+    vectors = embedding_model.client.encode(
+        texts,
+        batch_size=batch_size or config.EMBED_BATCH_SIZE,
+        normalize_embeddings=True,
+        show_progress_bar=False,
+    )
+    return [vector.tolist() for vector in vectors]
+
+
+class EmbeddingQueue:
+    """
+    Collects chunks from every file in an upload so they are encoded together in large batches
+    instead of one small encode call per file.
+    """
+
+    def __init__(self, embedding_model, batch_size=None, cache=None):
+        self.embedding_model = embedding_model
+        self.batch_size = batch_size or config.EMBED_BATCH_SIZE
+        self.cache = cache
+        self.pending = []
+        self.embedded_chunks = 0
+        # Chunks that actually went through the encoder (cache misses)
+        self.encoded_chunks = 0
+        self.embedding_seconds = 0.0
+
+    def __len__(self):
+        return sum(len(entry.chunks) for entry in self.pending)
+
+    def put(self, document, chunks, digest):
+        self.pending.append(PendingDocument(document, chunks, digest, None))
+
+    def encode(self, chunks):
+        """
+        Encodes a list of chunks right away and records the throughput.
+        Vectors already in the embedding cache are reused; only the misses hit the encoder.
+        """
+        start = time.perf_counter()
+        texts = [chunk.page_content for chunk in chunks]
+        if self.cache is None:
+            vectors = encode_texts(self.embedding_model, texts, self.batch_size)
+            self.encoded_chunks += len(texts)
+        else:
+            vectors = self.cache.get_many(texts)
+            missing = [i for i, vector in enumerate(vectors) if vector is None]
+            missing_texts = [texts[i] for i in missing]
+            fresh_vectors = encode_texts(self.embedding_model, missing_texts, self.batch_size)
+            for i, vector in zip(missing, fresh_vectors):
+                vectors[i] = vector
+            if missing_texts:
+                self.cache.put_many(missing_texts, fresh_vectors)
+            self.encoded_chunks += len(missing_texts)
+        self.embedding_seconds += time.perf_counter() - start
+        self.embedded_chunks += len(chunks)
+        return vectors
+
+    def flush(self):
+        """
+        Encodes every pending chunk in one pass and returns the documents with their vectors attached.
+        """
+        pending, self.pending = self.pending, []
+        vectors = self.encode([chunk for entry in pending for chunk in entry.chunks])
+
+        flushed = []
+        offset = 0
+        for entry in pending:
+            flushed.append(entry._replace(vectors=vectors[offset:offset + len(entry.chunks)]))
+            offset += len(entry.chunks)
+        return flushed
+
+    def throughput(self):
+        """
+        Returns the embedding throughput in chunks per second.
+        """
+        if not self.embedding_seconds:
+            return 0.0
+        return self.embedded_chunks / self.embedding_seconds
@@ -0,0 +1,97 @@
+import mmap
+import os
+import tempfile
+
+import numpy as np
+
+
+class ExactVectorStore:
+    """
+    Append-only float32 copy of every indexed vector, row i being FAISS position i, kept in a
+    file and read through a memory map. Quantized indexes re-score their candidates from it and
+    promotion and compaction rebuild from it, so lossy codes are never the source of another
+    index, and the exact copy costs page cache instead of resident memory.
+
+    With path=None the rows go to an anonymous temporary file.
+    """
+
+    def __init__(self, dimension, path=None):
+        self.dimension = dimension
+        self.path = path
+        if path is None:
+            self.file = tempfile.TemporaryFile()
+        else:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            # r+b rather than a+b: appends must land after the last row, not after stale bytes
+            open(path, "ab").close()
+            self.file = open(path, "r+b")
+        self.file.seek(0, os.SEEK_END)
+        self.count = self.file.tell() // self.row_bytes
+        self._map = None
+
+    @property
+    def row_bytes(self):
+        return 4 * self.dimension
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, positions):
+        """
+        Returns the rows at an index, slice or array of positions as an in-memory array.
+        """
+        return np.array(self._memmap()[positions])
+
+    def append(self, vectors):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dimension)
+        self.file.seek(self.count * self.row_bytes)
+        self.file.write(vectors.tobytes())
+        self.file.flush()
+        self.count += len(vectors)
+        self._map = None
+
+    def truncate(self, count):
+        """
+        Drops the rows from count onwards, e.g. ones appended after the index was last saved.
+        """
+        self.file.truncate(count * self.row_bytes)
+        self.count = count
+        self._map = None
+
+    def compacted(self, keep_positions, block_rows=65536):
+        """
+        Returns a new store holding the rows at keep_positions, in order. It is written next to
+        this one and only takes its place with replace().
+        """
+        other = ExactVectorStore(self.dimension, None if self.path is None else self.path + ".compact")
+        other.truncate(0)
+        for start in range(0, len(keep_positions), block_rows):
+            other.append(self[keep_positions[start:start + block_rows]])
+        return other
+
+    def replace(self, other):
+        """
+        Moves a compacted store into this one's file and closes this one. Returns the store to use.
+        """
+        if self.path is not None:
+            os.replace(other.path, self.path)
+            other.path = self.path
+        self.close()
+        return other
+
+    def close(self):
+        self._map = None
+        self.file.close()
+
+    def _memmap(self):
+        # Rows are only ever appended, so an existing map stays valid for the rows it covers
+        current = self._map
+        if current is None or len(current) != self.count:
+            if self.count == 0:
+                current = np.empty((0, self.dimension), dtype=np.float32)
+            else:
+                # mmap rather than np.memmap: it never moves the file position appends write at
+                buffer = mmap.mmap(self.file.fileno(), self.count * self.row_bytes, access=mmap.ACCESS_READ)
+                current = np.frombuffer(buffer, dtype=np.float32).reshape(self.count, self.dimension)
+            self._map = current
+        return current
@@ -0,0 +1,235 @@
+import io
+import multiprocessing
+import tempfile
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from langchain.schema import Document
+from openpyxl import load_workbook
+from pptx import Presentation
+from pypdf import PdfReader
+
+import config
+
+
+# "sections" are the located pieces of a document (a PDF page, a group of spreadsheet rows) that get split into chunks
+ExtractionResult = namedtuple("ExtractionResult", ["name", "document", "sections", "error"])
+
+
+class UnsupportedFileType(ValueError):
+    pass
+
+
+# <--------------------------------------------------Single-file parsing------------------------------------->
+def extract_document(name, data):
+    """
+    Parses an uploaded file straight from its in-memory buffer (bytes or memoryview) into a
+    Document and its sections, without copying the buffer. No temporary file is written
+    except for PDFs above the spool limit.
+    Runs inside the extraction pool, so it must stay a top-level, Streamlit-free function.
+    """
+    file_type = name.split(".")[-1]
+    combined_content = ""
+    sections = None
+
+    if file_type == "pdf":
+        with spooled_pdf(data) as pdf_file:
+            sections = list(iter_pdf_pages(name, pdf_file))
+        combined_content = " ".join([page.page_content for page in sections])
+
+    elif file_type == "pptx":
+        presentation = Presentation(BufferReader(data))
+        for slide in presentation.slides:
+            for shape in slide.shapes:
+                if shape.has_text_frame:
+                    combined_content += shape.text_frame.text + " "
+
+    elif file_type == "txt":
+        combined_content = str(data, "utf-8")
+
+    elif file_type == "xlsx":
+        sections = list(iter_xlsx_sections(name, BufferReader(data)))
+        combined_content = "\n\n".join([section.page_content for section in sections])
+
+    else:
+        raise UnsupportedFileType(f"File type '{file_type}' is not supported.")
+
+    document = Document(page_content=combined_content, metadata={"name": name})
+    return document, sections or [document]
+
+
+def spooled_pdf(data):
+    """
+    Returns a file to parse PDF bytes from: up to PDF_SPOOL_MAX_BYTES it reads the upload's
+    own buffer without copying it, beyond that the bytes are copied to an anonymous temp file.
+    The file is removed on close, even on errors.
+    """
+    if len(data) <= config.PDF_SPOOL_MAX_BYTES:
+        return BufferReader(data)
+    buffer = tempfile.TemporaryFile()
+    buffer.write(data)
+    buffer.seek(0)
+    return buffer
+
+
+class BufferReader(io.RawIOBase):
+    """
+    Read-only, seekable file over a bytes-like object. Unlike io.BytesIO, which copies a
+    memoryview on construction, only the ranges the parser actually reads are copied.
+    """
+
+    def __init__(self, data):
+        super().__init__()
+        self.view = memoryview(data).cast("B")
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        count = max(0, min(len(buffer), len(self.view) - self.position))
+        buffer[:count] = self.view[self.position:self.position + count]
+        self.position += count
+        return count
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += len(self.view)
+        if offset < 0:
+            raise ValueError("negative seek position")
+        self.position = offset
+        return self.position
+
+    def tell(self):
+        return self.position
+
+
+def _extract_safely(name, data):
+    """
+    Wraps extract_document so one bad file never takes down the others.
+    """
+    try:
+        document, sections = extract_document(name, data)
+        return ExtractionResult(name, document, sections, None)
+    except Exception as e:
+        return ExtractionResult(name, None, None, e)
+
+
+# <--------------------------------------------------Streaming PDF pages------------------------------------->
+def iter_pdf_pages(name, source):
+    """
+    Lazily yields one Document per PDF page, tagged with its 1-based page number.
+    Only the current page's text is held in memory.
+    """
+    reader = PdfReader(source)
+    for page_number, page in enumerate(reader.pages, start=1):
+        yield Document(page_content=page.extract_text() or "", metadata={"name": name, "page": page_number})
+
+
+def should_stream(name, data):
+    """
+    Returns True for PDFs large enough to be ingested page by page instead of in one piece.
+    """
+    return name.endswith(".pdf") and len(data) >= config.PDF_STREAMING_MIN_BYTES
+
+
+# <--------------------------------------------------Streaming XLSX rows------------------------------------->
+def iter_xlsx_sections(name, source, max_chars=None):
+    """
+    Streams every sheet of a workbook in read-only mode and yields row-group Documents.
+    Each group repeats the sheet's header row and stays under max_chars, so it is embedded
+    as a single chunk tagged with its sheet and row range.
+    """
+    max_chars = max_chars or config.XLSX_CHUNK_CHARS
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            header = None
+            lines = []
+            size = 0
+            row_start = row_end = None
+
+            for row_number, row in enumerate(sheet.iter_rows(values_only=True), start=1):
+                values = ["" if value is None else str(value) for value in row]
+                if not any(values):
+                    continue
+                line = " | ".join(values).rstrip(" |")
+
+                if header is None:
+                    header = f"Sheet: {sheet.title}\n{line}"
+                    continue
+
+                if lines and size + len(line) + 1 > max_chars - len(header):
+                    yield _xlsx_section(name, sheet.title, header, lines, row_start, row_end)
+                    lines = []
+                    size = 0
+
+                if not lines:
+                    row_start = row_number
+                row_end = row_number
+                lines.append(line)
+                size += len(line) + 1
+
+            if lines:
+                yield _xlsx_section(name, sheet.title, header, lines, row_start, row_end)
+            elif header is not None:
+                # Header-only sheet: still worth indexing the column names
+                yield Document(page_content=header, metadata={"name": name, "sheet": sheet.title})
+    finally:
+        workbook.close()
+
+
+def _xlsx_section(name, sheet_title, header, lines, row_start, row_end):
+    metadata = {"name": name, "sheet": sheet_title, "row_start": row_start, "row_end": row_end}
+    return Document(page_content=header + "\n" + "\n".join(lines), metadata=metadata)
+
+
+# <--------------------------------------------------Parallel extraction------------------------------------->
+_pools = {}
+
+
+def _get_pool(max_workers):
+    """
+    Returns a long-lived process pool so workers are spawned once, not on every upload.
+    """
+    pool = _pools.get(max_workers)
+    if pool is None:
+        # "spawn" avoids forking a parent that already holds torch/tokenizer threads
+        pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+        _pools[max_workers] = pool
+    return pool
+
+
+def extract_uploads(uploads, max_workers=None):
+    """
+    Parses (name, buffer) pairs on a bounded process pool.
+    Work starts immediately; the returned iterator yields an ExtractionResult per file in
+    completion order, and failures are reported, not raised.
+    """
+    uploads = list(uploads)
+    max_workers = max_workers or config.EXTRACT_WORKERS
+
+    # A pool round-trip is not worth it for a single file
+    if max_workers <= 1 or len(uploads) <= 1:
+        return (_extract_safely(name, data) for name, data in uploads)
+
+    # Buffers cannot be pickled, so pool workers receive plain bytes
+    pool = _get_pool(max_workers)
+    futures = {pool.submit(_extract_safely, name, bytes(data)): name for name, data in uploads}
+    return _collect(futures, max_workers)
+
+
+def _collect(futures, max_workers):
+    for future in as_completed(futures):
+        try:
+            yield future.result()
+        except BrokenProcessPool as e:
+            # A worker died (e.g. out of memory); drop the pool so the next upload gets a fresh one
+            _pools.pop(max_workers, None)
+            yield ExtractionResult(futures[future], None, None, e)
@@ -0,0 +1,199 @@
+"""
+LLM generation paths shared by the Streamlit pages and the load-testing harness.
+Streamlit-free: every function takes the LLM to use, defaulting to a shared GatewayLLM.
+"""
+import re
+
+import config
+from llm_gateway import GatewayLLM
+
+
+_default_llm = None
+
+
+def get_llm():
+    """
+    Returns the module's default LLM, created on first use. Scripts without per-session LLM
+    settings use it too, so the model and gateway are set up in one place.
+    """
+    global _default_llm
+    if _default_llm is None:
+        _default_llm = GatewayLLM(model=config.LLM_MODEL)
+    return _default_llm
+
+
+# <----------------------------------------------------Summarization------------------------------------->
+def summarize_text_with_llama(text, llm=None):
+    """
+    Summarizes the provided text using the locally running LLaMA 3.2 model.
+    """
+    # Extract and return the generated summary
+    summary = "".join(stream_summary_with_llama(text, llm)).strip()
+    return summary
+
+
+def stream_summary_with_llama(text, llm=None, callbacks=None):
+    """
+    Streams the summary's text chunks as the model generates them.
+    callbacks are LangChain callback handlers for the LLM call.
+    """
+    # Prepare the context for summarization
+    prompt = f"""
+    Please summarize the following text:
+
+    {text}
+    """
+
+    # Use the locally running LLaMA model to generate the summary
+    return (llm or get_llm()).stream(prompt, config={"callbacks": callbacks})
+
+
+# <----------------------------------------------------Highlights------------------------------------->
+def generate_description_with_ollama(entity_text, entity_type, context, llm=None):
+    """
+    Generates concise descriptions for entities using Ollama.
+    """
+    return "".join(stream_description_with_ollama(entity_text, entity_type, context, llm)).strip()
+
+
+def stream_description_with_ollama(entity_text, entity_type, context, llm=None, callbacks=None):
+    """
+    Streams an entity description's text chunks as the model generates them.
+    callbacks are LangChain callback handlers for the LLM call.
+    """
+    prompt = f"""
+    Entity: {entity_text} ({entity_type})
+    Context: {context}
+    Task: Provide a single-sentence refined description of this entity.
+    """
+
+    # Use the locally installed Ollama model
+    return (llm or get_llm()).stream(prompt, config={"callbacks": callbacks})
+
+
+# <----------------------------------------------------Quiz------------------------------------->
+def parse_quiz(response):
+    """
+    Parses "Question n: ... A) ... Answer: X" formatted text into question dicts.
+    """
+    quiz_questions = []
+    try:
+        # Split the response into individual questions using regex
+        questions = re.split(r"(?=Question \d+:)", response)
+
+        for question in questions:
+            if not question.strip():
+                continue
+
+            # Extract the question text
+            question_match = re.search(r"Question \d+: (.+)", question)
+            question_text = question_match.group(1).strip() if question_match else None
+
+            # Extract choices
+            choices = {}
+            choice_matches = re.findall(r"([A-D])\) (.+)", question)
+
+            for choice in choice_matches:
+                choices[choice[0]] = choice[1].strip()
+
+            # Extract the answer
+            answer_match = re.search(r"Answer: ([A-D])", question)
+            correct_answer = answer_match.group(1).strip() if answer_match else None
+
+            if question_text and choices and correct_answer:
+                quiz_questions.append({
+                    "question": question_text,
+                    "choices": [f"{key}) {value}" for key, value in choices.items()],
+                    "answer": correct_answer
+                })
+
+        return quiz_questions
+
+    except Exception as e:
+        raise ValueError(f"Error while parsing quiz questions: {e}")
+
+
+def generate_quiz_questions(document_content, num_questions=5, llm=None):
+    """
+    Generate quiz questions based on the document content.
+    Raises ValueError if the model's response cannot be parsed.
+    """
+    # Construct the prompt for the LLM
+    question_prompt = (
+        f"Generate {num_questions} multiple-choice quiz questions from the following text:\n\n{document_content}\n\n"
+        "Format the output as:\n"
+        "Question [number]: [Your question here]\n"
+        "Choices:\n"
+        "A) [Option A]\n"
+        "B) [Option B]\n"
+        "C) [Option C]\n"
+        "D) [Option D]\n"
+        "Answer: [Correct option letter]\n"
+        "Ensure all questions are relevant and based on the text provided."
+    )
+
+    # Get the response from the LLM
+    response = (llm or get_llm())(question_prompt)
+
+    # Validate and parse the structured response
+    return parse_quiz(response)
+
+
+# <----------------------------------------------------Learning paths------------------------------------->
+def extract_meaningful_keywords_with_llama(text, num_keywords=10, llm=None):
+    """
+    Extracts structured, course-like keywords using LLaMA.
+    Filters to ensure actionable topics are returned.
+    """
+    prompt = f"""
+    From the following text, identify up to {num_keywords} concise, well-defined course topics.
+    Only return short, actionable topics like "Python," "Machine Learning," "Deep Learning," etc.
+    Avoid explanations, summaries, or full sentences.
+
+    {text}
+    """
+
+    # Use the LLaMA model to generate the keywords
+    response = (llm or get_llm())(prompt)
+
+    # Clean and extract keywords from the response
+    keywords = [keyword.strip() for keyword in response.split(",") if len(keyword.strip()) > 0]
+    return keywords[:num_keywords]  # Limit to the top num_keywords
+
+
+def generate_learning_path_with_llama(keyword, llm=None):
+    """
+    Generates a structured learning path for the given keyword using the LLaMA model.
+    """
+    prompt = f"""
+    Create a structured learning roadmap for the topic '{keyword}' divided into three levels: Beginner, Intermediate, and Advanced.
+    Each level should have 3-5 concise subtopics or key concepts to learn. Do not include explanations or long descriptions.
+    Example format:
+    Beginner: Topic 1, Topic 2
+    Intermediate: Topic 3, Topic 4
+    Advanced: Topic 5, Topic 6
+    """
+
+    # Use the LLaMA model to generate the learning path
+    response = (llm or get_llm())(prompt)
+
+    # Return the structured learning path
+    return response.strip()
+
+
+def parse_and_clean_learning_path(learning_path):
+    """
+    Cleans and parses the learning path text into a hierarchical format for visualization.
+    Handles irregular responses and ensures proper structure.
+    """
+    levels = {"Beginner": [], "Intermediate": [], "Advanced": []}
+
+    # Parse the LLaMA response and map to levels
+    for line in learning_path.split("\n"):
+        if line.lower().startswith("beginner"):
+            levels["Beginner"] = [topic.strip() for topic in line[len("Beginner:"):].split(",") if topic.strip()]
+        elif line.lower().startswith("intermediate"):
+            levels["Intermediate"] = [topic.strip() for topic in line[len("Intermediate:"):].split(",") if topic.strip()]
+        elif line.lower().startswith("advanced"):
+            levels["Advanced"] = [topic.strip() for topic in line[len("Advanced:"):].split(",") if topic.strip()]
+    return levels
@@ -5,6 +5,7 @@ from langchain_community.vectorstores import FAISS  # Updated imports
 from langchain.schema import Document
 from langchain.chains import RetrievalQA
 from langchain_community.llms import OpenAI, Ollama  # Updated imports
+import generation
 from pptx import Presentation
 import pandas as pd
 from sentence_transformers import SentenceTransformer
@@ -20,6 +21,7 @@ import matplotlib.pyplot as plt
 from transformers import BartForConditionalGeneration, BartTokenizer
 from difflib import HtmlDiff, SequenceMatcher
 import tempfile
+from extraction import extract_uploads
 from transformers import AutoModelForCausalLM, AutoTokenizer, AutoModelForTokenClassification, AutoModelForSeq2SeqLM
 from transformers import pipeline
 import nltk
@@ -51,7 +53,7 @@ st.title("Corporate Training Knowledge Hub")
 
 # <------------------------------------Initialize components------------------------------------->
 # Initialize the LLaMA model using Ollama
-llm = Ollama(model="llama3.2")  # Replace with your locally installed LLaMA model
+llm = generation.get_llm()
 
 
     
@@ -69,44 +71,15 @@ tabs = st.tabs(["Upload Files", "Original Context", "Document Summarization", "I
 # <--------------------------------------------------Upload and process files------------------------------------->
 def process_files(uploaded_files):
     global vectorstore
-    for uploaded_file in uploaded_files:
-        file_type = uploaded_file.name.split(".")[-1]
-        combined_content = ""
-        document = None
-
-        with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-            temp_file.write(uploaded_file.read())
-            temp_file_path = temp_file.name
-
-        if file_type == "pdf":
-            loader = PyPDFLoader(temp_file_path)
-            all_pages = loader.load()
-            combined_content = " ".join([page.page_content for page in all_pages])
-            document = Document(page_content=combined_content, metadata={"name": uploaded_file.name})
-
-        elif file_type == "pptx":
-            presentation = Presentation(temp_file_path)
-            for slide in presentation.slides:
-                for shape in slide.shapes:
-                    if shape.has_text_frame:
-                        combined_content += shape.text_frame.text + " "
-            document = Document(page_content=combined_content, metadata={"name": uploaded_file.name})
-
-        elif file_type == "txt":
-            with open(temp_file_path, "r", encoding="utf-8") as file:
-                combined_content = file.read()
-            document = Document(page_content=combined_content, metadata={"name": uploaded_file.name})
-
-        elif file_type == "xlsx":
-            excel_data = pd.read_excel(temp_file_path)
-            combined_content = excel_data.to_string(index=False)
-            document = Document(page_content=combined_content, metadata={"name": uploaded_file.name})
-
-        if document is None:
-            st.warning(f"File type '{file_type}' is not supported.")
-            os.remove(temp_file_path)
+    uploads = [(uploaded_file.name, uploaded_file.getbuffer()) for uploaded_file in uploaded_files]
+
+    # Parse files in parallel; results arrive in completion order
+    for result in extract_uploads(uploads):
+        if result.error is not None:
+            st.warning(f"Could not process '{result.name}': {result.error}")
             continue
 
+        document = result.document
         document_store.append(document)
         texts = [document.page_content]
         if vectorstore is None:
@@ -114,8 +87,6 @@ def process_files(uploaded_files):
         else:
             vectorstore.add_texts(texts)
 
-        os.remove(temp_file_path)
-
 # <----------------------------------------------------Summarization function------------------------------------->
 
 def summarize_text_with_llama(text):
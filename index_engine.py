@@ -0,0 +1,336 @@
+import math
+
+import faiss
+import numpy as np
+
+import config
+
+
+SCALAR_QUANTIZERS = {
+    "fp16": faiss.ScalarQuantizer.QT_fp16,
+    "int8": faiss.ScalarQuantizer.QT_8bit,
+}
+
+
+# <--------------------------------------------------Index kinds------------------------------------->
+def base_index(index):
+    """
+    Returns the index doing the candidate search, looking through the IndexRefineFlat wrapper
+    that older saved indexes used for exact re-scoring.
+    """
+    if isinstance(index, faiss.IndexRefine):
+        return faiss.downcast_index(index.base_index)
+    return index
+
+
+def index_kind(index):
+    """
+    Returns "flat", "ivf" or "hnsw" for a FAISS index.
+    """
+    index = base_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf"
+    return "flat"
+
+
+def quantization(index):
+    """
+    Returns how vectors are stored: "none" (float32), "fp16", "int8" or "pq".
+    """
+    index = base_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        index = faiss.downcast_index(index.storage)
+    if isinstance(index, (faiss.IndexPQ, faiss.IndexIVFPQ)):
+        return "pq"
+    if isinstance(index, (faiss.IndexScalarQuantizer, faiss.IndexIVFScalarQuantizer)):
+        return "fp16" if index.sq.qtype == faiss.ScalarQuantizer.QT_fp16 else "int8"
+    return "none"
+
+
+def bytes_per_vector(index):
+    """
+    Approximate memory per stored vector, including IVF ids, HNSW links and the in-RAM float32
+    copy of legacy IndexRefineFlat indexes. The exact vectors of an ExactVectorStore are on disk.
+    """
+    total = 0
+    if isinstance(index, faiss.IndexRefine):
+        total += faiss.downcast_index(index.refine_index).code_size
+    index = base_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        # Level-0 neighbour lists (2 * M int32 links) dominate the graph's size
+        total += faiss.downcast_index(index.storage).code_size + index.hnsw.nb_neighbors(0) * 4
+    elif isinstance(index, faiss.IndexIVF):
+        total += index.code_size + 8
+    else:
+        total += index.code_size
+    return total
+
+
+def should_promote(index):
+    """
+    Returns True once a plain flat index has grown past the size where exact search gets slow,
+    or where quantizing it is configured and there are enough vectors to train on.
+    """
+    if index_kind(index) != "flat":
+        return False
+    if config.ANN_INDEX_TYPE in ("ivf", "hnsw") and index.ntotal >= config.ANN_PROMOTE_THRESHOLD:
+        return True
+    return (
+        config.VECTOR_QUANTIZATION != "none"
+        and quantization(index) == "none"
+        and index.ntotal >= config.QUANTIZE_MIN_VECTORS
+    )
+
+
+def promotion_kind(index):
+    """
+    Returns the index kind a promoted index should have at its current size.
+    """
+    if config.ANN_INDEX_TYPE in ("ivf", "hnsw") and index.ntotal >= config.ANN_PROMOTE_THRESHOLD:
+        return config.ANN_INDEX_TYPE
+    return "flat"
+
+
+def reconstruct_all(index, start=0):
+    """
+    Returns the stored vectors from position start onwards as a float32 array.
+    """
+    count = index.ntotal - start
+    if count <= 0:
+        return np.empty((0, index.d), dtype=np.float32)
+    if not isinstance(index, faiss.IndexIVF):
+        return index.reconstruct_n(start, count)
+    # IVF needs a direct map to reconstruct by position; drop it again afterwards
+    index.make_direct_map()
+    try:
+        return index.reconstruct_n(start, count)
+    finally:
+        index.make_direct_map(False)
+
+
+# <--------------------------------------------------Building------------------------------------->
+def build_index(vectors, kind, dimension=None, quantization=None):
+    """
+    Builds a filled FAISS index of the given kind from a float32 array of vectors.
+    Vectors are stored as float32, fp16, int8 or product-quantized codes; exact re-scoring
+    happens at search time with rescore(). Indexes that need training (IVF, int8, PQ) are
+    trained on a random sample of at most IVF_TRAIN_SAMPLE vectors.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    dimension = dimension or vectors.shape[1]
+    quantization = quantization or config.VECTOR_QUANTIZATION
+
+    if kind == "hnsw":
+        if quantization == "pq":
+            index = faiss.IndexHNSWPQ(dimension, config.PQ_M, config.HNSW_M)
+        elif quantization in SCALAR_QUANTIZERS:
+            index = faiss.IndexHNSWSQ(dimension, SCALAR_QUANTIZERS[quantization], config.HNSW_M)
+        else:
+            index = faiss.IndexHNSWFlat(dimension, config.HNSW_M)
+        index.hnsw.efConstruction = config.HNSW_EF_CONSTRUCTION
+        index.hnsw.efSearch = config.HNSW_EF_SEARCH
+
+    elif kind == "ivf":
+        nlist = config.IVF_NLIST or max(1, int(4 * math.sqrt(len(vectors))))
+        # FAISS needs at least one training point per list
+        nlist = min(nlist, len(vectors))
+        quantizer = faiss.IndexFlatL2(dimension)
+        if quantization == "pq":
+            index = faiss.IndexIVFPQ(quantizer, dimension, nlist, config.PQ_M, 8)
+        elif quantization in SCALAR_QUANTIZERS:
+            index = faiss.IndexIVFScalarQuantizer(quantizer, dimension, nlist, SCALAR_QUANTIZERS[quantization])
+        else:
+            index = faiss.IndexIVFFlat(quantizer, dimension, nlist)
+        # The index keeps a reference to its coarse quantizer
+        index.quantizer_ref = quantizer
+        index.nprobe = config.IVF_NPROBE
+
+    else:
+        if quantization == "pq":
+            index = faiss.IndexPQ(dimension, config.PQ_M, 8)
+        elif quantization in SCALAR_QUANTIZERS:
+            index = faiss.IndexScalarQuantizer(dimension, SCALAR_QUANTIZERS[quantization])
+        else:
+            index = faiss.IndexFlatL2(dimension)
+
+    if not index.is_trained:
+        sample_size = min(len(vectors), config.IVF_TRAIN_SAMPLE)
+        index.train(vectors[np.random.default_rng(0).choice(len(vectors), sample_size, replace=False)])
+    if len(vectors):
+        index.add(vectors)
+    return index
+
+
+def rebuild_index(index, vectors):
+    """
+    Rebuilds an index of the same kind from the exact float32 vectors it should hold, numbered
+    0..n-1 in order. FAISS remove_ids renumbers flat indexes but not IVF ones and is not
+    supported by HNSW, so compaction always goes through here. Trained IVF and quantized flat
+    indexes keep their training. Pass exact vectors rather than reconstruct_all output: codes
+    decoded and quantized again lose precision on every rebuild.
+    """
+    return build_like(index_template(index), vectors)
+
+
+def index_template(index):
+    """
+    Captures what rebuild_index needs from an index: its kind and storage settings, plus an
+    empty copy when its training must be kept. Cheap next to the rebuild itself, so callers
+    can take it under a lock and run build_like outside.
+    """
+    kind = index_kind(index)
+    trained = None
+    if kind == "ivf" or (kind == "flat" and quantization(index) in ("int8", "pq")):
+        # A legacy IndexRefineFlat comes back unwrapped: re-scoring now reads the exact store
+        trained = faiss.clone_index(base_index(index))
+        trained.reset()
+    return {
+        "kind": kind,
+        "dimension": index.d,
+        "quantization": quantization(index),
+        "trained": trained,
+    }
+
+
+def build_like(template, vectors):
+    """
+    Builds an index from an index_template and a float32 array of vectors.
+    """
+    if template["trained"] is not None:
+        rebuilt = template["trained"]
+        if len(vectors):
+            rebuilt.add(vectors)
+        return rebuilt
+    return build_index(
+        vectors, template["kind"], dimension=template["dimension"],
+        quantization=template["quantization"],
+    )
+
+
+# <--------------------------------------------------Searching------------------------------------->
+def search_parameters(index, nprobe=None, ef_search=None, k_factor=None, selector=None):
+    """
+    Returns per-query FAISS search parameters (nprobe for IVF, efSearch for HNSW, k_factor
+    for exact re-scoring, an IDSelector restricting the searched positions), or None when
+    there is nothing to set. Each index type only accepts its own parameters class, and a flat PQ index accepts no
+    selector at all: check accepts_selector first, or use search_filtered.
+    """
+    kind = index_kind(index)
+    params = None
+    if kind == "ivf":
+        params = faiss.SearchParametersIVF(nprobe=nprobe or config.IVF_NPROBE)
+    elif kind == "hnsw":
+        params = faiss.SearchParametersHNSW(efSearch=ef_search or config.HNSW_EF_SEARCH)
+    elif selector is not None:
+        if not accepts_selector(index):
+            raise ValueError("A flat PQ index cannot filter with an IDSelector; use search_filtered.")
+        params = faiss.SearchParameters()
+    if selector is not None:
+        # The selector filters candidates during the scan/graph walk, not afterwards
+        params.sel = selector
+        params.selector_ref = selector
+
+    if isinstance(index, faiss.IndexRefine):
+        refine_params = faiss.IndexRefineSearchParameters(k_factor=k_factor or config.RESCORE_K_FACTOR)
+        if params is not None:
+            refine_params.base_index_params = params
+            # Keep the base parameters alive as long as the wrapper
+            refine_params.base_params_ref = params
+        params = refine_params
+    return params
+
+
+def accepts_selector(index):
+    """
+    Returns True if FAISS can apply an IDSelector while searching this index. IVF, HNSW and
+    flat float32/scalar-quantized indexes can; IndexPQ rejects any selector.
+    """
+    return not (index_kind(index) == "flat" and quantization(index) == "pq")
+
+
+def search_filtered(index, query_vectors, k, positions, exclude=False, selector=None):
+    """
+    Searches only the given index positions, or with exclude=True every position but them.
+    Where the index accepts a selector the filter runs inside FAISS (selector may be a cached
+    one for the same positions); otherwise results are over-fetched and filtered afterwards,
+    doubling the fetch until every query has k hits or the whole index was searched.
+    Returns (distances, positions) arrays of shape (len(query_vectors), k), padded with -1.
+    """
+    positions = np.asarray(positions, dtype=np.int64)
+    if accepts_selector(index):
+        if selector is None:
+            selector = exclusion_selector(positions) if exclude else id_selector(positions)
+        return search(index, query_vectors, k, search_parameters(index, selector=selector))
+
+    params = search_parameters(index)
+    available = index.ntotal - len(positions) if exclude else len(positions)
+    wanted = min(k, available)
+    fetch_k = min(index.ntotal, max(2 * k, k + 16))
+    while True:
+        distances, labels = search(index, query_vectors, fetch_k, params)
+        keep = np.isin(labels, positions, invert=exclude) & (labels != -1)
+        if fetch_k >= index.ntotal or (keep.sum(axis=1) >= wanted).all():
+            break
+        fetch_k = min(index.ntotal, fetch_k * 2)
+
+    filtered_distances = np.full((len(labels), k), np.inf, dtype=np.float32)
+    filtered_labels = np.full((len(labels), k), -1, dtype=np.int64)
+    for row, row_keep in enumerate(keep):
+        hits = np.flatnonzero(row_keep)[:k]
+        filtered_distances[row, :len(hits)] = distances[row, hits]
+        filtered_labels[row, :len(hits)] = labels[row, hits]
+    return filtered_distances, filtered_labels
+
+
+def rescore(query_vectors, labels, exact_vectors, k):
+    """
+    Re-ranks quantized candidates by their exact squared L2 distance and keeps the best k.
+    labels are candidate positions (-1 for none) and exact_vectors anything indexable by an
+    array of positions, e.g. an ExactVectorStore, so only the candidates' rows are read.
+    Returns (distances, positions) arrays of shape (len(query_vectors), k), padded with -1.
+    """
+    query_vectors = np.asarray(query_vectors, dtype=np.float32)
+    distances = np.full((len(labels), k), np.inf, dtype=np.float32)
+    positions = np.full((len(labels), k), -1, dtype=np.int64)
+    for row, (query, candidates) in enumerate(zip(query_vectors, labels)):
+        candidates = candidates[candidates != -1]
+        if not len(candidates):
+            continue
+        # The store reads fastest in position order
+        candidates = np.unique(candidates)
+        exact = np.sum((exact_vectors[candidates] - query) ** 2, axis=1)
+        best = np.argsort(exact, kind="stable")[:k]
+        distances[row, :len(best)] = exact[best]
+        positions[row, :len(best)] = candidates[best]
+    return distances, positions
+
+
+def id_selector(positions):
+    """
+    Returns a FAISS IDSelector accepting only the given index positions.
+    """
+    positions = np.ascontiguousarray(positions, dtype=np.int64)
+    return faiss.IDSelectorBatch(len(positions), faiss.swig_ptr(positions))
+
+
+def exclusion_selector(positions):
+    """
+    Returns a FAISS IDSelector accepting every index position except the given ones.
+    """
+    excluded = id_selector(positions)
+    selector = faiss.IDSelectorNot(excluded)
+    # IDSelectorNot only holds a pointer: keep the wrapped selector alive with it
+    selector.excluded_ref = excluded
+    return selector
+
+
+def search(index, query_vectors, k, params=None):
+    """
+    Runs a FAISS search with optional search parameters.
+    """
+    query_vectors = np.ascontiguousarray(query_vectors, dtype=np.float32)
+    if params is None:
+        return index.search(query_vectors, k)
+    return index.search(query_vectors, k, params=params)
@@ -0,0 +1,258 @@
+import itertools
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+import config
+from embeddings import EmbeddingQueue
+from extraction import extract_uploads, iter_pdf_pages, should_stream, spooled_pdf
+from knowledge_base import content_hash
+
+
+STAGES = ["queued", "parse", "split", "embed", "index", "done"]
+
+
+# <--------------------------------------------------Ingestion jobs------------------------------------->
+class IngestionJob:
+    """
+    One upload batch, with the current stage of every file in it.
+    """
+
+    def __init__(self, job_id, uploads, digests):
+        self.id = job_id
+        self.uploads = uploads
+        self.digests = digests
+        self.created = time.time()
+        self.finished = None
+        self.embedding_queue = None
+        # name -> {"stage": one of STAGES or "failed", "detail": str}
+        self.files = OrderedDict((name, {"stage": "queued", "detail": ""}) for name, _ in uploads)
+
+    def set_stage(self, name, stage, detail=""):
+        self.files[name] = {"stage": stage, "detail": detail}
+
+    def fail(self, name, error):
+        self.files[name] = {"stage": "failed", "detail": str(error)}
+
+    def progress(self):
+        """
+        Returns the fraction of per-file stages completed, between 0 and 1.
+        """
+        if not self.files:
+            return 1.0
+        last = len(STAGES) - 1
+        steps = sum(last if state["stage"] == "failed" else STAGES.index(state["stage"]) for state in self.files.values())
+        return steps / (last * len(self.files))
+
+    @property
+    def done(self):
+        return self.finished is not None
+
+
+class IngestionWorker:
+    """
+    Background thread that parses, splits, embeds and indexes uploads off the Streamlit
+    script thread. Kept in st.cache_resource, so jobs survive reruns and browser refreshes,
+    and every document becomes searchable as soon as its own chunks are indexed.
+    """
+
+    # Finished jobs kept around for the progress view
+    HISTORY = 20
+
+    def __init__(self, knowledge_base, embedding_model, embedding_cache=None):
+        self.knowledge_base = knowledge_base
+        self.embedding_model = embedding_model
+        self.embedding_cache = embedding_cache
+        self.jobs = OrderedDict()
+        # (name, digest) of files that failed -> {"attempts", "retry_at" (time.monotonic())};
+        # the uploader keeps offering them on every rerun, so they are only re-queued with backoff
+        self.failed = {}
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.thread = threading.Thread(target=self._run, name="ingestion-worker", daemon=True)
+        self.thread.start()
+
+    def submit(self, uploaded_files):
+        """
+        Queues the uploaded files that are neither indexed nor already queued. Files that failed
+        before are skipped until their retry is due (see has_failed) or their bytes change.
+        Returns the new job, or None if there was nothing to do.
+        """
+        uploads = []
+        digests = {}
+        for uploaded_file in uploaded_files:
+            # getbuffer() avoids copying the upload and keeps its bytes alive for the job
+            file_bytes = uploaded_file.getbuffer()
+            digest = content_hash(file_bytes)
+            if not self.knowledge_base.needs_indexing(uploaded_file.name, digest) or self.is_pending(digest):
+                continue
+            if self.has_failed(uploaded_file.name, digest):
+                continue
+            uploads.append((uploaded_file.name, file_bytes))
+            digests[uploaded_file.name] = digest
+
+        if not uploads:
+            return None
+
+        with self.lock:
+            job = IngestionJob(next(self.ids), uploads, digests)
+            self.jobs[job.id] = job
+            while len(self.jobs) > self.HISTORY and next(iter(self.jobs.values())).done:
+                self.jobs.popitem(last=False)
+        self.queue.put(job)
+        return job
+
+    def is_pending(self, digest):
+        with self.lock:
+            return any(not job.done and digest in job.digests.values() for job in self.jobs.values())
+
+    def has_failed(self, name, digest):
+        """
+        Returns True while a failed file is waiting for its next automatic retry, or has used
+        up INGEST_MAX_ATTEMPTS and waits for retry_failed.
+        """
+        with self.lock:
+            entry = self.failed.get((name, digest))
+            if entry is None:
+                return False
+            return entry["attempts"] >= config.INGEST_MAX_ATTEMPTS or time.monotonic() < entry["retry_at"]
+
+    def failed_files(self):
+        """
+        Returns the names of files that failed and have not been indexed since.
+        """
+        with self.lock:
+            return sorted({name for name, _ in self.failed})
+
+    def retry_failed(self):
+        """
+        Forgets every failure, so the next submit queues those files again right away.
+        """
+        with self.lock:
+            self.failed.clear()
+
+    def active_jobs(self):
+        with self.lock:
+            return [job for job in self.jobs.values() if not job.done]
+
+    def recent_jobs(self):
+        with self.lock:
+            return list(reversed(self.jobs.values()))
+
+    def stop(self):
+        """
+        Ends the worker thread once queued jobs are done.
+        """
+        self.queue.put(None)
+
+    def _run(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            try:
+                self._process(job)
+            except Exception as e:
+                for name, state in job.files.items():
+                    if state["stage"] not in ("done", "failed"):
+                        job.fail(name, e)
+            finally:
+                # Free the raw bytes; only the stages are needed from here on
+                job.uploads = []
+                with self.lock:
+                    for name, state in job.files.items():
+                        key = (name, job.digests[name])
+                        if state["stage"] != "failed":
+                            self.failed.pop(key, None)
+                            continue
+                        attempts = self.failed.get(key, {"attempts": 0})["attempts"] + 1
+                        self.failed[key] = {
+                            "attempts": attempts,
+                            "retry_at": time.monotonic() + config.INGEST_RETRY_SECONDS * 2 ** (attempts - 1),
+                        }
+                job.finished = time.time()
+
+    # <--------------------------------------------------Pipeline------------------------------------->
+    def _process(self, job):
+        """
+        Runs one job through parse -> split -> embed -> index.
+        """
+        # start_index lets the context packer merge overlapping chunks of the same section
+        splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200, add_start_index=True)
+        embedding_queue = EmbeddingQueue(self.embedding_model, cache=self.embedding_cache)
+        job.embedding_queue = embedding_queue
+
+        streamed_uploads = [(name, data) for name, data in job.uploads if should_stream(name, data)]
+        uploads = [(name, data) for name, data in job.uploads if not should_stream(name, data)]
+
+        # Parse regular files on the process pool; a feeder thread hands results over as they
+        # complete so we can tell when nothing else is ready yet
+        ready = queue.Queue()
+        for name, _ in uploads:
+            job.set_stage(name, "parse")
+        feeder = threading.Thread(target=self._feed, args=(extract_uploads(uploads), ready), daemon=True)
+        feeder.start()
+
+        # Large PDFs stream page by page while the pool works on the rest
+        for name, data in streamed_uploads:
+            self._process_streamed(job, name, data, splitter, embedding_queue)
+
+        while True:
+            result = ready.get()
+            if result is None:
+                break
+            if result.error is not None:
+                job.fail(result.name, result.error)
+            else:
+                job.set_stage(result.name, "split")
+                chunks = splitter.split_documents(result.sections)
+                embedding_queue.put(result.document, chunks, job.digests[result.name])
+                job.set_stage(result.name, "embed", f"{len(chunks)} chunks")
+
+            # Batch chunks across files while more parses are already waiting, but never
+            # hold finished documents back when nothing else is ready
+            if ready.empty() or len(embedding_queue) >= config.EMBED_BATCH_SIZE * 8:
+                self._flush(job, embedding_queue)
+
+        self._flush(job, embedding_queue)
+        self.knowledge_base.save()
+
+        for name, state in job.files.items():
+            if state["stage"] not in ("done", "failed"):
+                job.fail(name, "No parse result was returned for this file.")
+
+    def _process_streamed(self, job, name, data, splitter, embedding_queue):
+        job.set_stage(name, "embed", "streaming pages")
+        try:
+            with spooled_pdf(data) as pdf_file:
+                pages = iter_pdf_pages(name, pdf_file)
+                self.knowledge_base.add_document_streaming(
+                    name, pages, job.digests[name], splitter, embedding_queue, config.STREAMING_FLUSH_CHUNKS,
+                    on_page=lambda count: job.set_stage(name, "embed", f"{count} pages indexed"),
+                )
+            job.set_stage(name, "done")
+        except Exception as e:
+            job.fail(name, e)
+
+    def _flush(self, job, embedding_queue):
+        if not embedding_queue.pending:
+            return
+        names = [entry.document.metadata["name"] for entry in embedding_queue.pending]
+        flushed = embedding_queue.flush()
+        for name in names:
+            job.set_stage(name, "index")
+        self.knowledge_base.add_documents(flushed)
+        for name in names:
+            job.set_stage(name, "done")
+
+    @staticmethod
+    def _feed(results, ready):
+        try:
+            for result in results:
+                ready.put(result)
+        finally:
+            ready.put(None)
@@ -0,0 +1,630 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+import uuid
+from typing import Any
+
+import faiss
+import numpy as np
+from langchain.schema import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_community.vectorstores import FAISS
+
+import config
+import index_engine
+from exact_vectors import ExactVectorStore
+from lexical_index import LexicalIndex, reciprocal_rank_fusion
+from metadata_index import MetadataIndex
+from query_cache import QueryEmbeddingCache
+
+
+# <--------------------------------------------------Ingestion ledger------------------------------------->
+def content_hash(data):
+    """
+    Returns the SHA-256 hex digest of an uploaded file's bytes.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+class IngestionLedger:
+    """
+    Remembers which uploads are already indexed, keyed by the SHA-256 of their bytes.
+    """
+
+    def __init__(self):
+        # name -> {"sha256": digest, "chunk_ids": [...]}
+        self.entries = {}
+
+    def status(self, name, digest):
+        """
+        Returns "new", "changed" or "unchanged" for an uploaded file.
+        """
+        entry = self.entries.get(name)
+        if entry is None:
+            return "new"
+        if entry["sha256"] != digest:
+            return "changed"
+        return "unchanged"
+
+    def record(self, name, digest, chunk_ids):
+        self.entries[name] = {"sha256": digest, "chunk_ids": list(chunk_ids)}
+
+    def forget(self, name):
+        return self.entries.pop(name, None)
+
+
+# <--------------------------------------------------Knowledge base------------------------------------->
+class KnowledgeBase:
+    """
+    Holds the uploaded documents, their FAISS and BM25 indexes and the ingestion ledger.
+    A single instance is kept in st.cache_resource so reruns and sessions share it, and
+    everything is saved to data_dir after each ingest so restarts do not start empty.
+    """
+
+    def __init__(self, embedding_model, data_dir=None):
+        self.embedding_model = embedding_model
+        # Repeated questions reuse their embedding instead of re-encoding
+        self.query_embeddings = QueryEmbeddingCache(embedding_model)
+        self.data_dir = data_dir
+        self.vectorstore = None
+        # Exact float32 copy of the indexed vectors on disk, for re-scoring and rebuilds
+        self.exact_vectors = None
+        # BM25 index over the same chunk ids, kept in step with FAISS on every insert and removal
+        self.lexical_index = LexicalIndex()
+        # Chunk ids per document/page/sheet, for searches scoped to part of the corpus
+        self.metadata_index = MetadataIndex()
+        self.document_store = []
+        self.ledger = IngestionLedger()
+        self.lock = threading.RLock()
+        # True while the FAISS index's IVF lists are a read-only memory map of index.faiss
+        self.mmapped = False
+        # Bumped on every change to the indexed documents
+        self.version = 0
+        # Chunk ids of replaced/deleted documents still physically in the index until compaction
+        self.tombstones = set()
+        # FAISS positions of the tombstoned chunks, excluded inside every unscoped search
+        self.tombstoned_positions = set()
+        self._tombstone_selector = self._tombstoned_array_cache = None
+        # True while a compaction or ANN promotion runs in the background
+        self.maintaining = False
+
+    def needs_indexing(self, name, digest):
+        """
+        Returns True if the file is new or its content changed since it was indexed.
+        """
+        with self.lock:
+            return self.ledger.status(name, digest) != "unchanged"
+
+    def add_documents(self, pending_documents):
+        """
+        Indexes already-embedded documents with a single bulk insert into FAISS,
+        replacing any earlier versions with the same names.
+        """
+        with self.lock:
+            chunks = []
+            vectors = []
+            for entry in pending_documents:
+                self._remove(entry.document.metadata["name"])
+                chunks.extend(entry.chunks)
+                vectors.extend(entry.vectors)
+            chunk_ids = self._add_embedded_chunks(chunks, vectors)
+
+            offset = 0
+            for entry in pending_documents:
+                self._record(entry.document, entry.digest, chunk_ids[offset:offset + len(entry.chunks)])
+                offset += len(entry.chunks)
+            self.version += 1
+        self._schedule_maintenance()
+
+    def add_document_streaming(self, name, pages, digest, splitter, embedding_queue, flush_size, on_page=None):
+        """
+        Indexes a document from a lazy page iterator. Each page is split as it arrives and
+        chunks are embedded and inserted flush_size at a time, so parsed pages, chunks and
+        vectors do not accumulate. The document's full text is still kept once, in the
+        document store, for the display tabs; while indexing, page texts are spooled to a
+        temporary file instead of being held in memory next to it.
+        The lock is only held while inserting, so searches keep running.
+        """
+        chunk_ids = []
+        page_count = 0
+        batch = []
+        text_file = tempfile.TemporaryFile(mode="w+", encoding="utf-8")
+        try:
+            for page in pages:
+                text_file.write((" " if page_count else "") + page.page_content)
+                page_count += 1
+                for chunk in splitter.split_documents([page]):
+                    batch.append(chunk)
+                    if len(batch) >= flush_size:
+                        vectors = embedding_queue.encode(batch)
+                        with self.lock:
+                            chunk_ids.extend(self._add_embedded_chunks(batch, vectors))
+                        batch = []
+                if on_page is not None:
+                    on_page(page_count)
+            vectors = embedding_queue.encode(batch)
+            with self.lock:
+                chunk_ids.extend(self._add_embedded_chunks(batch, vectors))
+            text_file.seek(0)
+            text = text_file.read()
+        except Exception:
+            # Do not leave a half-indexed document behind
+            with self.lock:
+                self._drop_chunks(chunk_ids)
+            raise
+        finally:
+            text_file.close()
+
+        document = Document(page_content=text, metadata={"name": name})
+        with self.lock:
+            # The previous version stays searchable until the new one is complete
+            self._remove(name)
+            self._record(document, digest, chunk_ids)
+            self.version += 1
+        self._schedule_maintenance()
+        return document
+
+    def delete_document(self, name):
+        """
+        Removes a document and all of its chunks from search. Returns False if it was not indexed.
+        """
+        with self.lock:
+            if name not in self.ledger.entries:
+                return False
+            self._remove(name)
+            self.version += 1
+        self._schedule_maintenance()
+        return True
+
+    def similarity_search(self, query, k=3, scope=None):
+        """
+        Searches the index while holding the lock, so background ingestion never
+        resizes the FAISS index under a running query.
+        """
+        query_vector = self.query_embeddings.embed_query(query)
+        return [document for _, document, _ in self.search_by_vector(query_vector, k, scope)]
+
+    def search_by_vector(self, query_vector, k, scope=None):
+        """
+        Returns up to k (chunk id, chunk, distance) tuples, skipping tombstoned chunks.
+        A scope (see MetadataIndex) restricts the search to matching chunks inside FAISS.
+        """
+        return self.search_by_vectors([query_vector], k, scope)[0]
+
+    def search_by_vectors(self, query_vectors, k, scope=None):
+        """
+        Batched search_by_vector: one FAISS call for all query vectors, one result list per query.
+        """
+        with self.lock:
+            if self.vectorstore is None or self.vectorstore.index.ntotal == 0:
+                return [[] for _ in query_vectors]
+            index = self.vectorstore.index
+            query_array = np.array(query_vectors, dtype=np.float32)
+            rescoring = self._rescoring(index)
+            # Quantized candidates are over-fetched and re-ranked by their exact vectors
+            fetch_k = k * config.RESCORE_K_FACTOR if rescoring else k
+            if scope:
+                # Tombstoned chunks are never in the selection, so no over-fetching is needed
+                chunk_ids = self.metadata_index.select(scope)
+                if not chunk_ids:
+                    return [[] for _ in query_vectors]
+                distances, positions = index_engine.search_filtered(
+                    index, query_array, min(len(chunk_ids), fetch_k),
+                    self.metadata_index.select_positions(chunk_ids),
+                )
+            elif self.tombstoned_positions:
+                distances, positions = index_engine.search_filtered(
+                    index, query_array, min(index.ntotal, fetch_k),
+                    self._tombstoned_array(), exclude=True, selector=self._tombstone_filter(index),
+                )
+            else:
+                distances, positions = index_engine.search(
+                    index, query_array, min(index.ntotal, fetch_k), index_engine.search_parameters(index),
+                )
+            if rescoring:
+                distances, positions = index_engine.rescore(query_array, positions, self.exact_vectors, k)
+
+            all_results = []
+            for row_distances, row_positions in zip(distances, positions):
+                results = []
+                for distance, position in zip(row_distances, row_positions):
+                    if position == -1:
+                        continue
+                    chunk_id = self.vectorstore.index_to_docstore_id[position]
+                    results.append((chunk_id, self.vectorstore.docstore.search(chunk_id), float(distance)))
+                    if len(results) == k:
+                        break
+                all_results.append(results)
+            return all_results
+
+    def _rescoring(self, index):
+        return config.RESCORE and index_engine.quantization(index) != "none" and self.exact_vectors is not None
+
+    def _tombstoned_array(self):
+        if self._tombstoned_array_cache is None:
+            self._tombstoned_array_cache = np.fromiter(
+                sorted(self.tombstoned_positions), dtype=np.int64, count=len(self.tombstoned_positions)
+            )
+        return self._tombstoned_array_cache
+
+    def _tombstone_filter(self, index):
+        """
+        Returns the selector skipping tombstoned positions inside FAISS, or None when the index
+        accepts no selector (flat PQ), in which case search_filtered post-filters instead.
+        Rebuilt only after tombstones change.
+        """
+        if not index_engine.accepts_selector(index):
+            return None
+        if self._tombstone_selector is None:
+            self._tombstone_selector = index_engine.exclusion_selector(self._tombstoned_array())
+        return self._tombstone_selector
+
+    def index_stats(self):
+        """
+        Returns the index kind, vector storage and approximate bytes per vector, or None when empty.
+        """
+        with self.lock:
+            if self.vectorstore is None:
+                return None
+            index = self.vectorstore.index
+            return {
+                "kind": index_engine.index_kind(index),
+                "quantization": index_engine.quantization(index),
+                "rescore": self._rescoring(index),
+                "vectors": index.ntotal,
+                "bytes_per_vector": index_engine.bytes_per_vector(index),
+            }
+
+    def hybrid_search(self, query, k=3, scope=None):
+        """
+        Fuses dense and BM25 results with weighted reciprocal rank fusion, so exact codes and
+        form numbers are found even when their embeddings are not close to the query's.
+        """
+        query_vector = self.query_embeddings.embed_query(query)
+        return self.hybrid_search_many([query], [query_vector], k, scope)[0]
+
+    def hybrid_search_many(self, queries, query_vectors, k=3, scope=None):
+        """
+        Batched hybrid_search over already-embedded queries: the dense side is a single
+        FAISS search for all of them. Returns one list of chunks per query.
+        """
+        candidates = max(k, config.HYBRID_CANDIDATES)
+        with self.lock:
+            dense_results = self.search_by_vectors(query_vectors, candidates, scope)
+            allowed = self.metadata_index.select(scope) if scope else None
+            all_documents = []
+            for query, dense_result in zip(queries, dense_results):
+                dense = [chunk_id for chunk_id, _, _ in dense_result]
+                if config.HYBRID_LEXICAL_WEIGHT <= 0:
+                    fused = dense
+                else:
+                    lexical = [chunk_id for chunk_id, _ in self.lexical_index.search(query, candidates, allowed)]
+                    fused = reciprocal_rank_fusion(
+                        [dense, lexical], [config.HYBRID_VECTOR_WEIGHT, config.HYBRID_LEXICAL_WEIGHT], config.RRF_K
+                    )
+                all_documents.append([self.vectorstore.docstore.search(chunk_id) for chunk_id in fused[:k]])
+            return all_documents
+
+    def memory_bytes(self):
+        """
+        Rough in-memory size: the vectors plus about three copies of the document text
+        (the documents, their overlapping chunks and the BM25 postings).
+        """
+        with self.lock:
+            text_bytes = sum(len(document.page_content) for document in self.document_store)
+            if self.vectorstore is None:
+                return text_bytes
+            index = self.vectorstore.index
+            return index.ntotal * index_engine.bytes_per_vector(index) + 3 * text_bytes
+
+    def scope_options(self, name):
+        """
+        Returns the page numbers and sheet titles a search within a document can be scoped to.
+        """
+        with self.lock:
+            return {"pages": self.metadata_index.pages(name), "sheets": self.metadata_index.sheets(name)}
+
+    def as_retriever(self, k=3, reranker=None, scope=None):
+        return KnowledgeBaseRetriever(knowledge_base=self, k=k, reranker=reranker, scope=scope)
+
+    def _add_embedded_chunks(self, chunks, vectors):
+        """
+        Inserts pre-computed chunk vectors into the FAISS index and the exact vector store,
+        and returns their ids.
+        """
+        if not chunks:
+            return []
+        self._ensure_writable()
+        start = 0 if self.vectorstore is None else self.vectorstore.index.ntotal
+        chunk_ids = [uuid.uuid4().hex for _ in chunks]
+        text_embeddings = [(chunk.page_content, vector) for chunk, vector in zip(chunks, vectors)]
+        metadatas = [chunk.metadata for chunk in chunks]
+        if self.exact_vectors is None:
+            self.exact_vectors = ExactVectorStore(len(vectors[0]), self._path("vectors.f32") if self.data_dir else None)
+            # Left over from a knowledge base that was never saved with an index
+            self.exact_vectors.truncate(0)
+        # Rows stay aligned with FAISS positions: undo the append if FAISS rejects the vectors
+        self.exact_vectors.append(vectors)
+        try:
+            if self.vectorstore is None:
+                self.vectorstore = FAISS.from_embeddings(text_embeddings, self.embedding_model, metadatas=metadatas, ids=chunk_ids)
+            else:
+                self.vectorstore.add_embeddings(text_embeddings, metadatas=metadatas, ids=chunk_ids)
+        except Exception:
+            self.exact_vectors.truncate(start)
+            raise
+        for position, (chunk_id, chunk) in enumerate(zip(chunk_ids, chunks), start=start):
+            self.lexical_index.add(chunk_id, chunk.page_content)
+            self.metadata_index.add(chunk_id, position, chunk.metadata)
+        return chunk_ids
+
+    def _record(self, document, digest, chunk_ids):
+        name = document.metadata["name"]
+        self.document_store.append(document)
+        self.ledger.record(name, digest, chunk_ids)
+
+    def _remove(self, name):
+        """
+        Drops a previously indexed document. Its vectors are only tombstoned here, which is
+        O(chunks); they are physically removed by the next compaction.
+        """
+        entry = self.ledger.forget(name)
+        if entry is None:
+            return
+        self.document_store[:] = [doc for doc in self.document_store if doc.metadata["name"] != name]
+        self._drop_chunks(entry["chunk_ids"])
+
+    def _drop_chunks(self, chunk_ids):
+        """
+        Tombstones chunks in FAISS and removes them from the BM25 and metadata indexes right away.
+        """
+        self.tombstones.update(chunk_ids)
+        self.tombstoned_positions.update(
+            self.metadata_index.positions[chunk_id] for chunk_id in chunk_ids if chunk_id in self.metadata_index.positions
+        )
+        self._tombstone_selector = self._tombstoned_array_cache = None
+        for chunk_id in chunk_ids:
+            self.metadata_index.remove(chunk_id)
+            chunk = self.vectorstore.docstore.search(chunk_id)
+            self.lexical_index.remove(chunk_id, chunk.page_content if isinstance(chunk, Document) else None)
+
+    # <--------------------------------------------------Maintenance------------------------------------->
+    def _schedule_maintenance(self):
+        """
+        Starts a background compaction once tombstones pass the configured share of the index,
+        or a promotion once a flat index passes ANN_PROMOTE_THRESHOLD or, with quantization
+        configured, QUANTIZE_MIN_VECTORS.
+        """
+        with self.lock:
+            if self.maintaining or self.vectorstore is None:
+                return
+            index = self.vectorstore.index
+            threshold = max(config.COMPACT_MIN_TOMBSTONES, config.COMPACT_TOMBSTONE_RATIO * index.ntotal)
+            if len(self.tombstones) >= threshold:
+                task = self.compact
+            elif index_engine.should_promote(index):
+                task = self.promote
+            else:
+                return
+            self.maintaining = True
+        threading.Thread(target=self._run_maintenance, args=(task,), name="index-maintenance", daemon=True).start()
+
+    def _run_maintenance(self, task):
+        try:
+            task()
+            self.save()
+        finally:
+            self.maintaining = False
+
+    def compact(self):
+        """
+        Physically removes tombstoned vectors and their docstore entries in a single rebuild.
+        Like promote, the rebuild runs outside the lock on a snapshot, so searches (and the
+        workspace pool's memory accounting) are not held up; vectors added and documents
+        deleted meanwhile are carried over before the swap. The index is rebuilt from the
+        exact vector store, which is compacted alongside it.
+        """
+        with self.lock:
+            if not self.tombstones:
+                return
+            self._ensure_writable()
+            index = self.vectorstore.index
+            snapshot_size = index.ntotal
+            dropped = set(self.tombstones)
+            index_to_docstore_id = dict(self.vectorstore.index_to_docstore_id)
+            keep = [
+                position for position in range(snapshot_size)
+                if index_to_docstore_id[position] not in dropped
+            ]
+            template = index_engine.index_template(index)
+            exact_vectors = self.exact_vectors
+
+        # The store only grows while unlocked, so its first snapshot_size rows are stable
+        compacted = exact_vectors.compacted(np.array(keep, dtype=np.int64))
+        rebuilt = index_engine.build_like(template, compacted[:])
+
+        with self.lock:
+            current = self.vectorstore.index
+            new_index_to_docstore_id = {
+                new_position: index_to_docstore_id[old_position] for new_position, old_position in enumerate(keep)
+            }
+            # Chunks added while rebuilding go after the kept ones, in their original order
+            for old_position in range(snapshot_size, current.ntotal):
+                new_index_to_docstore_id[len(new_index_to_docstore_id)] = self.vectorstore.index_to_docstore_id[old_position]
+            added = self.exact_vectors[snapshot_size:]
+            if len(added):
+                rebuilt.add(added)
+                compacted.append(added)
+
+            self.exact_vectors = self.exact_vectors.replace(compacted)
+            self.vectorstore.index = rebuilt
+            self.vectorstore.index_to_docstore_id = new_index_to_docstore_id
+            self.vectorstore.docstore.delete(list(dropped))
+            # Documents deleted while rebuilding stay tombstoned at their new positions
+            self.tombstones -= dropped
+            self.tombstoned_positions = {
+                position for position, chunk_id in new_index_to_docstore_id.items() if chunk_id in self.tombstones
+            }
+            self._tombstone_selector = self._tombstoned_array_cache = None
+            self.metadata_index.reposition(new_index_to_docstore_id)
+
+    def promote(self):
+        """
+        Moves a flat float32 index to the configured ANN index (IVF or HNSW) and/or quantized
+        storage, built from the exact vector store. Training and building run outside the lock
+        on a snapshot; vectors added meanwhile are copied over before the swap.
+        """
+        with self.lock:
+            self._ensure_writable()
+            index = self.vectorstore.index
+            snapshot_size = index.ntotal
+            kind = index_engine.promotion_kind(index)
+            exact_vectors = self.exact_vectors
+
+        promoted = index_engine.build_index(exact_vectors[:snapshot_size], kind, dimension=index.d)
+
+        with self.lock:
+            added = self.exact_vectors[snapshot_size:]
+            if len(added):
+                promoted.add(added)
+            self.vectorstore.index = promoted
+
+    # <--------------------------------------------------Persistence------------------------------------->
+    def _path(self, filename):
+        return os.path.join(self.data_dir, filename)
+
+    def save(self):
+        """
+        Writes the index, docstore, documents and ledger to data_dir; the exact vector store
+        (vectors.f32) is already written as vectors are added.
+        Files are replaced atomically so processes that memory-mapped the old index keep working.
+        """
+        if not self.data_dir or self.vectorstore is None:
+            return
+        with self.lock:
+            os.makedirs(self.data_dir, exist_ok=True)
+            # A still memory-mapped index is unchanged since load (every write goes through
+            # _ensure_writable first), and writing it would read back from the file it replaces
+            if not self.mmapped:
+                self._replace("index.faiss", lambda path: faiss.write_index(self.vectorstore.index, path))
+            self._replace("docstore.pkl", lambda path: self._dump_pickle(
+                path, (self.vectorstore.docstore, self.vectorstore.index_to_docstore_id)
+            ))
+            self._replace("documents.pkl", lambda path: self._dump_pickle(path, self.document_store))
+            self._replace("ledger.json", lambda path: self._dump_json(path, self.ledger.entries))
+            self._replace("tombstones.json", lambda path: self._dump_json(path, sorted(self.tombstones)))
+            self._replace("lexical.pkl", lambda path: self._dump_pickle(path, self.lexical_index))
+
+    def load(self):
+        """
+        Restores a previously saved knowledge base. An IVF index has its inverted lists
+        memory-mapped read-only, so start-up does not read them and several processes share
+        their pages. FAISS only maps IVF lists: flat and HNSW indexes (below
+        ANN_PROMOTE_THRESHOLD, or with ANN_INDEX_TYPE=hnsw) are read fully into RAM.
+        The exact vector store is reopened in place; rows appended after the last save are
+        dropped, and a missing store is rebuilt from the index (only as exact as its codes).
+        """
+        if not self.data_dir or not os.path.exists(self._path("index.faiss")):
+            return False
+        with self.lock:
+            index = faiss.read_index(self._path("index.faiss"), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            legacy_refine = isinstance(index, faiss.IndexRefine)
+            if legacy_refine:
+                # Saved with an in-RAM IndexRefineFlat: its float32 copy seeds the exact store
+                exact = index_engine.reconstruct_all(faiss.downcast_index(index.refine_index))
+                index = faiss.clone_index(index_engine.base_index(index))
+            if self.exact_vectors is not None:
+                self.exact_vectors.close()
+            self.exact_vectors = ExactVectorStore(index.d, self._path("vectors.f32"))
+            if len(self.exact_vectors) > index.ntotal:
+                self.exact_vectors.truncate(index.ntotal)
+            elif len(self.exact_vectors) < index.ntotal:
+                self.exact_vectors.truncate(0)
+                self.exact_vectors.append(exact if legacy_refine else index_engine.reconstruct_all(index))
+            with open(self._path("docstore.pkl"), "rb") as file:
+                docstore, index_to_docstore_id = pickle.load(file)
+            with open(self._path("documents.pkl"), "rb") as file:
+                self.document_store[:] = pickle.load(file)
+            with open(self._path("ledger.json"), "r", encoding="utf-8") as file:
+                self.ledger.entries = json.load(file)
+            if os.path.exists(self._path("tombstones.json")):
+                with open(self._path("tombstones.json"), "r", encoding="utf-8") as file:
+                    self.tombstones = set(json.load(file))
+
+            if os.path.exists(self._path("lexical.pkl")):
+                with open(self._path("lexical.pkl"), "rb") as file:
+                    self.lexical_index = pickle.load(file)
+            else:
+                # Saved before hybrid retrieval existed: rebuild BM25 from the docstore
+                self.lexical_index = LexicalIndex()
+                for chunk_id in index_to_docstore_id.values():
+                    if chunk_id not in self.tombstones:
+                        self.lexical_index.add(chunk_id, docstore.search(chunk_id).page_content)
+
+            self.metadata_index = MetadataIndex()
+            self.tombstoned_positions = set()
+            self._tombstone_selector = self._tombstoned_array_cache = None
+            for position, chunk_id in index_to_docstore_id.items():
+                if chunk_id in self.tombstones:
+                    self.tombstoned_positions.add(position)
+                else:
+                    self.metadata_index.add(chunk_id, position, docstore.search(chunk_id).metadata)
+
+            self.vectorstore = FAISS(self.embedding_model, index, docstore, index_to_docstore_id)
+            # The unwrapped legacy index is an in-RAM copy and must be saved again
+            self.mmapped = index_engine.index_kind(index) == "ivf" and not legacy_refine
+        return True
+
+    def _ensure_writable(self):
+        """
+        Swaps a memory-mapped index for an in-RAM copy before the first write to it.
+        """
+        if self.mmapped:
+            self.vectorstore.index = faiss.read_index(self._path("index.faiss"))
+            self.mmapped = False
+
+    def _replace(self, filename, write):
+        temp_path = self._path(filename + ".tmp")
+        write(temp_path)
+        os.replace(temp_path, self._path(filename))
+
+    @staticmethod
+    def _dump_pickle(path, value):
+        with open(path, "wb") as file:
+            pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _dump_json(path, value):
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(value, file)
+
+
+# <--------------------------------------------------Retriever------------------------------------->
+class KnowledgeBaseRetriever(BaseRetriever):
+    """
+    LangChain retriever running hybrid (dense + BM25) search on a KnowledgeBase through its lock.
+    With a reranker, a wider candidate set is retrieved and only the k best re-ranked chunks
+    are returned. A scope (see MetadataIndex) limits the search to some documents, pages or a sheet.
+    """
+
+    knowledge_base: Any
+    k: int = 3
+    reranker: Any = None
+    scope: Any = None
+
+    def scoped(self, scope):
+        """
+        Returns a copy of this retriever limited to a scope, or itself when scope is empty.
+        """
+        return self.model_copy(update={"scope": scope}) if scope else self
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        if self.reranker is None:
+            return self.knowledge_base.hybrid_search(query, k=self.k, scope=self.scope)
+        candidates = self.knowledge_base.hybrid_search(
+            query, k=max(self.k, config.RERANK_CANDIDATES), scope=self.scope
+        )
+        return self.reranker.rerank(query, candidates, self.k)
@@ -0,0 +1,110 @@
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+
+
+# Words, plus codes such as "HR-101", "SKU_4471/B" or "v2.3" kept together as one token
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_/.][a-z0-9]+)*")
+
+# Words frequent enough that their posting lists would dominate query time while adding no signal
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how i if in is it its of on or "
+    "our should that the their there this to was we what when where which who will with you your".split()
+)
+
+
+def tokenize(text):
+    """
+    Lower-cases text and returns its tokens. Compound codes are emitted whole and also split
+    into their parts, so "HR-101" matches queries for "HR-101" as well as "HR 101".
+    """
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(part for part in re.split(r"[-_/.]", token) if part not in STOPWORDS)
+    return tokens
+
+
+# <--------------------------------------------------BM25 index------------------------------------->
+class LexicalIndex:
+    """
+    Incremental BM25 inverted index over chunk texts, keyed by the same chunk ids as the FAISS
+    docstore. Adding or removing a chunk only touches the postings of its own terms, and a
+    query only visits the postings of its terms, so lookups stay well under a millisecond.
+    Not thread-safe on its own; KnowledgeBase guards it with its lock.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        # term -> {chunk id: term frequency}
+        self.postings = defaultdict(dict)
+        # chunk id -> number of tokens
+        self.lengths = {}
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def add(self, chunk_id, text):
+        if chunk_id in self.lengths:
+            self.remove(chunk_id)
+        terms = Counter(tokenize(text))
+        for term, frequency in terms.items():
+            self.postings[term][chunk_id] = frequency
+        length = sum(terms.values())
+        self.lengths[chunk_id] = length
+        self.total_length += length
+
+    def remove(self, chunk_id, text=None):
+        """
+        Drops a chunk. Passing its text avoids scanning every posting list for it.
+        """
+        length = self.lengths.pop(chunk_id, None)
+        if length is None:
+            return
+        self.total_length -= length
+        terms = set(tokenize(text)) if text is not None else list(self.postings)
+        for term in terms:
+            postings = self.postings.get(term)
+            if postings is not None and postings.pop(chunk_id, None) is not None and not postings:
+                del self.postings[term]
+
+    def search(self, query, k, allowed=None):
+        """
+        Returns up to k (chunk id, BM25 score) pairs, best first. If allowed is given, only
+        those chunk ids are scored.
+        """
+        if not self.lengths:
+            return []
+        count = len(self.lengths)
+        average_length = self.total_length / count
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, frequency in postings.items():
+                if allowed is not None and chunk_id not in allowed:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[chunk_id] / average_length)
+                scores[chunk_id] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+
+# <--------------------------------------------------Fusion------------------------------------->
+def reciprocal_rank_fusion(rankings, weights, k=60):
+    """
+    Fuses ranked lists of ids: each id scores sum(weight / (k + rank)) over the lists it
+    appears in. Returns ids ordered by fused score.
+    """
+    scores = defaultdict(float)
+    for ranking, weight in zip(rankings, weights):
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] += weight / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import config
+
+
+# <--------------------------------------------------LLM response cache------------------------------------->
+class LLMResponseCache:
+    """
+    Persistent SQLite cache of LLM completions keyed by hash(model, prompt, generation options),
+    shared by every session and feature, so re-opening the same document's summary, quiz,
+    highlights or roadmap costs no LLM time. Entries expire after ttl seconds, and least
+    recently used ones are evicted once the stored text exceeds max_bytes.
+    """
+
+    def __init__(self, path, max_bytes=None, ttl=None):
+        self.max_bytes = max_bytes or config.LLM_CACHE_MAX_BYTES
+        self.ttl = config.LLM_CACHE_TTL if ttl is None else ttl
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self.connection.commit()
+
+    @staticmethod
+    def key(model, prompt, options=None):
+        options = json.dumps(options or {}, sort_keys=True, default=str)
+        return hashlib.sha256(f"{model}\0{options}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def get(self, model, prompt, options=None):
+        """
+        Returns the cached completion, or None if there is none or it expired.
+        """
+        key = self.key(model, prompt, options)
+        now = time.time()
+        with self.lock:
+            row = self.connection.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl and now - row[1] > self.ttl:
+                self.connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.connection.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.connection.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self.connection.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, model, prompt, response, options=None):
+        now = time.time()
+        row = (self.key(model, prompt, options), response, len(response.encode("utf-8")), now, now)
+        with self.lock:
+            self.connection.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)", row)
+            self.connection.commit()
+            self._evict()
+
+    def _evict(self):
+        if self.ttl:
+            self.connection.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,))
+        total = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        while total > self.max_bytes:
+            rows = self.connection.execute("SELECT key, size FROM responses ORDER BY last_used LIMIT 100").fetchall()
+            if not rows:
+                break
+            victims = []
+            for key, size in rows:
+                victims.append((key,))
+                total -= size
+                if total <= self.max_bytes:
+                    break
+            self.connection.executemany("DELETE FROM responses WHERE key = ?", victims)
+        self.connection.commit()
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        with self.lock:
+            entries, size = self.connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hit_rate(), "entries": entries, "size_bytes": size}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """
+    Returns the process-wide response cache, or None when KHIA_LLM_CACHE is off.
+    """
+    global _cache
+    if not config.LLM_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMResponseCache(os.path.join(config.DATA_DIR, "llm_cache.sqlite"))
+        return _cache
@@ -0,0 +1,372 @@
+import asyncio
+import json
+import queue
+import threading
+from contextlib import asynccontextmanager
+from typing import Any
+
+import httpx
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import GenerationChunk
+
+import config
+from llm_cache import LLMResponseCache, get_response_cache
+
+
+class LLMGatewayError(RuntimeError):
+    pass
+
+
+class LLMBusyError(LLMGatewayError):
+    """
+    Raised instead of queueing when too many requests are already waiting for the backend.
+    """
+
+
+class LLMTimeoutError(LLMGatewayError):
+    pass
+
+
+_DONE = object()
+
+
+class _SharedStream:
+    """
+    One in-flight streamed generation and the chunks it has produced so far, read by every
+    request coalesced onto it. Only touched from the gateway's loop thread.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.subscribers = 0
+        self.task = None
+        self.changed = asyncio.Event()
+
+    def publish(self, chunk=None, error=None, done=False):
+        if chunk is not None:
+            self.chunks.append(chunk)
+        self.error = error
+        self.done = done
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+
+# <--------------------------------------------------Gateway------------------------------------->
+class OllamaGateway:
+    """
+    Async client for Ollama's /api/generate. All requests of the process share one event loop
+    thread and one keep-alive connection pool, and at most max_concurrency of them reach the
+    backend at once. Requests beyond that wait for a slot up to queue_timeout seconds; once
+    max_waiting are already waiting, new ones fail fast with LLMBusyError (back-pressure).
+
+    Identical requests (same model, prompt and options) arriving while one is in flight are
+    coalesced: they wait on that generation instead of sending their own, and streamed ones
+    receive its tokens, replayed from the start for late joiners. coalesced counts the
+    requests saved this way.
+
+    The coroutines (agenerate, astream) run on the gateway's loop; generate and stream are
+    blocking wrappers usable from any thread.
+    """
+
+    def __init__(self, base_url=None, max_concurrency=None, max_waiting=None, queue_timeout=None, request_timeout=None,
+                 coalesce=None):
+        self.base_url = base_url or config.OLLAMA_BASE_URL
+        self.max_concurrency = max_concurrency or config.LLM_MAX_CONCURRENCY
+        self.max_waiting = config.LLM_MAX_WAITING if max_waiting is None else max_waiting
+        self.queue_timeout = queue_timeout or config.LLM_QUEUE_TIMEOUT
+        self.request_timeout = request_timeout or config.LLM_REQUEST_TIMEOUT
+        self.waiting = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.coalesce = config.LLM_COALESCE if coalesce is None else coalesce
+        self.coalesced = 0
+        # Request key -> in-flight generation task / _SharedStream
+        self.pending_generations = {}
+        self.pending_streams = {}
+
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="llm-gateway", daemon=True)
+        self.thread.start()
+        # Created on the loop thread so they bind to the gateway's loop
+        self.semaphore, self.client = asyncio.run_coroutine_threadsafe(self._setup(), self.loop).result()
+
+    async def _setup(self):
+        client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=httpx.Timeout(self.request_timeout, connect=config.LLM_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency),
+        )
+        return asyncio.Semaphore(self.max_concurrency), client
+
+    @asynccontextmanager
+    async def _slot(self):
+        if self.waiting >= self.max_waiting:
+            self.rejected += 1
+            raise LLMBusyError(f"The language model is busy ({self.waiting} requests waiting); please try again shortly.")
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise LLMBusyError(f"No language model slot became free within {self.queue_timeout:.0f}s.") from None
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self.semaphore.release()
+
+    def _payload(self, model, prompt, stream, options):
+        payload = {"model": model, "prompt": prompt, "stream": stream, "keep_alive": config.OLLAMA_KEEP_ALIVE}
+        if options:
+            payload["options"] = options
+        return payload
+
+    async def agenerate(self, model, prompt, options=None):
+        """
+        Returns the full completion for a prompt, joining an identical in-flight request if any.
+        """
+        if not self.coalesce:
+            return await self._generate(model, prompt, options)
+
+        key = LLMResponseCache.key(model, prompt, options)
+        task = self.pending_generations.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(self._generate(model, prompt, options))
+            self.pending_generations[key] = task
+            task.add_done_callback(lambda finished: self._generation_finished(key, finished))
+        # One caller giving up must not cancel the generation the others are waiting on
+        return await asyncio.shield(task)
+
+    def _generation_finished(self, key, task):
+        if self.pending_generations.get(key) is task:
+            del self.pending_generations[key]
+        if not task.cancelled():
+            # Marks the exception as retrieved when every caller already gave up
+            task.exception()
+
+    async def _generate(self, model, prompt, options):
+        async with self._slot():
+            try:
+                response = await self.client.post("/api/generate", json=self._payload(model, prompt, False, options))
+                response.raise_for_status()
+            except httpx.TimeoutException as e:
+                raise LLMTimeoutError(f"The language model did not answer within {self.request_timeout:.0f}s.") from e
+            except httpx.HTTPError as e:
+                raise LLMGatewayError(f"Language model request failed: {e}") from e
+            return response.json().get("response", "")
+
+    async def astream(self, model, prompt, options=None):
+        """
+        Yields the completion's text chunks as Ollama streams them, joining an identical
+        in-flight stream if any. The generation is cancelled once all its readers stop early.
+        """
+        if not self.coalesce:
+            async for chunk in self._stream(model, prompt, options):
+                yield chunk
+            return
+
+        key = LLMResponseCache.key(model, prompt, options)
+        shared = self.pending_streams.get(key)
+        if shared is not None:
+            self.coalesced += 1
+        else:
+            shared = _SharedStream()
+            self.pending_streams[key] = shared
+            shared.task = asyncio.ensure_future(self._produce(key, shared, model, prompt, options))
+
+        shared.subscribers += 1
+        position = 0
+        try:
+            while True:
+                if position < len(shared.chunks):
+                    position += 1
+                    yield shared.chunks[position - 1]
+                elif shared.done:
+                    if shared.error is not None:
+                        raise shared.error
+                    return
+                else:
+                    await shared.changed.wait()
+        finally:
+            shared.subscribers -= 1
+            if not shared.subscribers and not shared.done:
+                # Nobody is reading any more: free the slot, and let later requests start afresh
+                if self.pending_streams.get(key) is shared:
+                    del self.pending_streams[key]
+                shared.task.cancel()
+
+    async def _produce(self, key, shared, model, prompt, options):
+        """
+        Runs one streamed generation and publishes its chunks to the stream's readers.
+        """
+        try:
+            async for chunk in self._stream(model, prompt, options):
+                shared.publish(chunk)
+            shared.publish(done=True)
+        except asyncio.CancelledError:
+            shared.publish(error=LLMGatewayError("The language model request was cancelled."), done=True)
+        except Exception as e:
+            shared.publish(error=e, done=True)
+        finally:
+            if self.pending_streams.get(key) is shared:
+                del self.pending_streams[key]
+
+    async def _stream(self, model, prompt, options):
+        async with self._slot():
+            try:
+                async with self.client.stream(
+                    "POST", "/api/generate", json=self._payload(model, prompt, True, options)
+                ) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if not line:
+                            continue
+                        message = json.loads(line)
+                        if message.get("error"):
+                            raise LLMGatewayError(f"Language model error: {message['error']}")
+                        if message.get("response"):
+                            yield message["response"]
+                        if message.get("done"):
+                            break
+            except httpx.TimeoutException as e:
+                raise LLMTimeoutError(f"The language model stalled for more than {self.request_timeout:.0f}s.") from e
+            except httpx.HTTPError as e:
+                raise LLMGatewayError(f"Language model request failed: {e}") from e
+
+    def generate(self, model, prompt, options=None):
+        """
+        Blocking agenerate for synchronous callers.
+        """
+        return asyncio.run_coroutine_threadsafe(self.agenerate(model, prompt, options), self.loop).result()
+
+    def stream(self, model, prompt, options=None):
+        """
+        Blocking astream for synchronous callers: a generator fed from the gateway's loop.
+        Closing it early cancels the request and frees its slot.
+        """
+        chunks = queue.Queue()
+
+        async def pump():
+            try:
+                async for chunk in self.astream(model, prompt, options):
+                    chunks.put(chunk)
+            except Exception as e:
+                chunks.put(e)
+            finally:
+                chunks.put(_DONE)
+
+        future = asyncio.run_coroutine_threadsafe(pump(), self.loop)
+        try:
+            while True:
+                chunk = chunks.get()
+                if chunk is _DONE:
+                    return
+                if isinstance(chunk, Exception):
+                    raise chunk
+                yield chunk
+        finally:
+            future.cancel()
+
+    def stats(self):
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "coalesced": self.coalesced,
+            "max_concurrency": self.max_concurrency,
+        }
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway():
+    """
+    Returns the process-wide gateway, so every session and feature shares its pool and limit.
+    """
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = OllamaGateway()
+        return _gateway
+
+
+# <--------------------------------------------------LangChain adapter------------------------------------->
+class GatewayLLM(LLM):
+    """
+    Drop-in replacement for langchain_community's Ollama LLM that goes through the shared
+    gateway, so llm(prompt), llm.stream(prompt) and LangChain chains keep working unchanged.
+    Extra keyword arguments become Ollama generation options (temperature, num_predict, ...).
+
+    Completions are served from the persistent response cache when the same model, prompt and
+    options were seen before. bypass_cache (on the LLM or per call) always generates fresh,
+    with the new result still refreshing the cache; use_cache=False leaves the cache alone.
+    """
+
+    model: str = config.LLM_MODEL
+    gateway: Any = None
+    use_cache: bool = True
+    bypass_cache: bool = False
+
+    @property
+    def _llm_type(self):
+        return "ollama-gateway"
+
+    @property
+    def _identifying_params(self):
+        return {"model": self.model}
+
+    def _get_gateway(self):
+        return self.gateway or get_gateway()
+
+    def _call(self, prompt, stop=None, run_manager=None, **kwargs):
+        cache, options = self._prepare(stop, kwargs)
+        if cache is not None:
+            cached = cache.get(self.model, prompt, options)
+            if cached is not None:
+                return cached
+        response = self._get_gateway().generate(self.model, prompt, options)
+        if self.use_cache and get_response_cache() is not None:
+            get_response_cache().put(self.model, prompt, response, options)
+        return response
+
+    def _stream(self, prompt, stop=None, run_manager=None, **kwargs):
+        cache, options = self._prepare(stop, kwargs)
+        cached = cache.get(self.model, prompt, options) if cache is not None else None
+        if cached is not None:
+            texts = [cached]
+        else:
+            texts = self._get_gateway().stream(self.model, prompt, options)
+
+        parts = []
+        for text in texts:
+            parts.append(text)
+            # Marked so metering can tell a cache hit from a (very fast) generation
+            chunk = GenerationChunk(text=text, generation_info={"cached": True} if cached is not None else None)
+            if run_manager is not None:
+                run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
+
+        # Only complete streams are cached; an abandoned one never reaches this point
+        if cached is None and self.use_cache and get_response_cache() is not None:
+            get_response_cache().put(self.model, prompt, "".join(parts), options)
+
+    def _prepare(self, stop, kwargs):
+        """
+        Returns the cache to read from (None when bypassed) and the Ollama options for a call.
+        """
+        bypass = kwargs.pop("bypass_cache", self.bypass_cache) or not self.use_cache
+        options = dict(kwargs, stop=stop) if stop else kwargs
+        return (None if bypass else get_response_cache()), options
@@ -1,11 +1,15 @@
 
 # Import necessary libraries
 import streamlit as st
+from streamlit import runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from langchain_community.document_loaders import PyPDFLoader, TextLoader  # Updated imports
 from langchain_community.vectorstores import FAISS  # Updated imports
 from langchain.schema import Document
 from langchain.chains import RetrievalQA
 from langchain_community.llms import OpenAI, Ollama  # Updated imports
+from llm_gateway import GatewayLLM, get_gateway
+from llm_cache import get_response_cache
 from pptx import Presentation
 import pandas as pd
 from sentence_transformers import SentenceTransformer
@@ -28,14 +32,25 @@ from langchain_core.messages import HumanMessage,AIMessage
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.prompts import MessagesPlaceholder
+from langchain_core.runnables import ConfigurableField
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain.chains import create_retrieval_chain
 from langchain.chains import create_history_aware_retriever
 from langchain.memory import ConversationBufferMemory
 import random
 import re
+import time
 import pprint
 import json
+from embedding_cache import EmbeddingCache
+from workspaces import WorkspacePool, workspace_name
+from reranker import Reranker
+from qa_engine import QAEngine, append_turn
+from bulk_qa import answer_questions, read_questions
+from context_packer import ContextPacker
+from streaming import CachedCompletionListener, GenerationStats, MeteredStream
+import generation
+import config
 
 
 
@@ -55,71 +70,125 @@ st.set_page_config(page_title="Corporate Training Knowledge Hub", layout="wide")
 st.title("Corporate Training Knowledge Hub")
 
 # <------------------------------------Initialize components------------------------------------->
-# Initialize the LLaMA model using Ollama
-llm = Ollama(model="llama3.2")  # Replace with your locally installed LLaMA model
+# Initialize the LLaMA model using Ollama, through the shared gateway (see llm_gateway.py)
+bypass_llm_cache = st.sidebar.checkbox(
+    "Regenerate LLM responses", help="Skip the LLM response cache and generate fresh summaries, quizzes and highlights."
+)
+llm = GatewayLLM(model=config.LLM_MODEL, bypass_cache=bypass_llm_cache)
+# The QA engines are cached per workspace for every session, so their LLM must not carry this
+# session's choice: it is passed on each call instead
+qa_llm = GatewayLLM(model=config.LLM_MODEL).configurable_fields(
+    bypass_cache=ConfigurableField(id="bypass_cache", name="Bypass the LLM response cache")
+)
 
 
     
 
 
 # Load embedding model for document processing
-embedding_model = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-vectorstore = None
-document_store = []
+embedding_model = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2", encode_kwargs={"normalize_embeddings": True})
+
+
+@st.cache_resource
+def load_embedding_cache():
+    """
+    Opens the on-disk chunk embedding cache shared by every session.
+    """
+    return EmbeddingCache(
+        os.path.join(config.DATA_DIR, "embedding_cache.sqlite"), embedding_model.model_name, config.EMBEDDING_CACHE_MAX_BYTES
+    )
+
+
+@st.cache_resource
+def load_workspace_pool():
+    """
+    Creates the pool of per-workspace knowledge bases once. Each workspace's index and
+    ingestion jobs outlive reruns and browser refreshes; idle ones are unloaded to disk.
+    A workspace stays loaded while a connected session has it selected.
+    """
+    return WorkspacePool(embedding_model, load_embedding_cache(), session_alive=runtime.get_instance().is_active_session)
+
+
+@st.cache_resource
+def load_reranker():
+    """
+    Loads the cross-encoder once; its score cache is shared by every session.
+    """
+    return Reranker()
+
+
+@st.cache_resource
+def load_context_packer():
+    """
+    Creates the context packer once, so its tokenizer is loaded once and shared by every
+    workspace's QA engine instead of reloading whenever an engine is rebuilt.
+    """
+    return ContextPacker()
+
+
+@st.cache_resource
+def load_generation_stats():
+    """
+    Collects time-to-first-token and tokens/s of every streamed generation, across sessions.
+    """
+    return GenerationStats()
+
+
+def build_qa_engine(knowledge_base):
+    """
+    Builds the prompts and chains once per workspace index version instead of on every question.
+    The retriever re-ranks a wider hybrid candidate set down to the best CONTEXT_CANDIDATES
+    chunks, which the packer merges and fits into the prompt's token budget.
+    """
+    retriever = knowledge_base.as_retriever(k=config.CONTEXT_CANDIDATES, reranker=reranker)
+    return QAEngine(qa_llm, retriever, packer=context_packer)
+
+
+# Every team or session works in its own workspace, picked in the sidebar or with ?workspace=<name>
+workspace_pool = load_workspace_pool()
+if "workspace" not in st.session_state:
+    st.session_state.workspace = workspace_name(st.query_params.get("workspace"))
+workspace = workspace_pool.get(st.session_state.workspace, holder=get_script_run_ctx().session_id)
+
+knowledge_base = workspace.knowledge_base
+embedding_cache = load_embedding_cache()
+ingestion_worker = workspace.ingestion_worker
+reranker = load_reranker()
+context_packer = load_context_packer()
+generation_stats = load_generation_stats()
+answer_cache = workspace.answer_cache
+vectorstore = knowledge_base.vectorstore
+document_store = knowledge_base.document_store
+st.session_state.seen_index_version = knowledge_base.version
 
 # <---------------------------------------------Define tabs for functionalities------------------------------------>
 
 tabs = st.tabs(["Upload Files", "Original Context", "Document Summarization", "Interactive Chatbot", "Quiz", "Compare Docs","Word Cloud", "Highlights"])
 
 # <--------------------------------------------------Upload and process files------------------------------------->
-def process_files(uploaded_files):
-    global vectorstore
-    for uploaded_file in uploaded_files:
-        file_type = uploaded_file.name.split(".")[-1]
-        combined_content = ""
-        document = None
-
-        with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-            temp_file.write(uploaded_file.read())
-            temp_file_path = temp_file.name
-
-        if file_type == "pdf":
-            loader = PyPDFLoader(temp_file_path)
-            all_pages = loader.load()
-            combined_content = " ".join([page.page_content for page in all_pages])
-            document = Document(page_content=combined_content, metadata={"name": uploaded_file.name})
-
-        elif file_type == "pptx":
-            presentation = Presentation(temp_file_path)
-            for slide in presentation.slides:
-                for shape in slide.shapes:
-                    if shape.has_text_frame:
-                        combined_content += shape.text_frame.text + " "
-            document = Document(page_content=combined_content, metadata={"name": uploaded_file.name})
-
-        elif file_type == "txt":
-            with open(temp_file_path, "r", encoding="utf-8") as file:
-                combined_content = file.read()
-            document = Document(page_content=combined_content, metadata={"name": uploaded_file.name})
-
-        elif file_type == "xlsx":
-            excel_data = pd.read_excel(temp_file_path)
-            combined_content = excel_data.to_string(index=False)
-            document = Document(page_content=combined_content, metadata={"name": uploaded_file.name})
-
-        if document is None:
-            st.warning(f"File type '{file_type}' is not supported.")
-            os.remove(temp_file_path)
-            continue
-
-        document_store.append(document)
-        texts = [document.page_content]
-        if vectorstore is None:
-            vectorstore = FAISS.from_texts(texts, embedding_model)
-        else:
-            vectorstore.add_texts(texts)
+@st.fragment(run_every=1 if ingestion_worker.active_jobs() else None)
+def show_ingestion_progress():
+    """
+    Shows per-file, per-stage progress of background uploads, refreshing every second while
+    jobs are running, and reruns the app whenever new documents become searchable.
+    """
+    polling = bool(ingestion_worker.active_jobs())
+    for job in ingestion_worker.recent_jobs()[:5]:
+        status = "finished" if job.done else "processing"
+        st.progress(job.progress(), text=f"Upload #{job.id}: {status}")
+        st.table(pd.DataFrame(
+            [{"File": name, "Stage": state["stage"], "Details": state["detail"]} for name, state in job.files.items()]
+        ))
+        embedding_queue = job.embedding_queue
+        if job.done and embedding_queue is not None and embedding_queue.embedded_chunks:
+            st.caption(
+                f"Embedded {embedding_queue.embedded_chunks} chunks at {embedding_queue.throughput():.0f} chunks/s "
+                f"({embedding_queue.encoded_chunks} encoded, cache hit rate {embedding_cache.hit_rate():.0%})"
+            )
 
-        os.remove(temp_file_path)
+    # Documents finished in the background: refresh the other tabs
+    if knowledge_base.version != st.session_state.seen_index_version or (polling and not ingestion_worker.active_jobs()):
+        st.rerun()
 
 # <----------------------------------------------------Summarization function------------------------------------->
 
@@ -127,84 +196,84 @@ def summarize_text_with_llama(text):
     """
     Summarizes the provided text using the locally running LLaMA 3.2 model.
     """
-    # Prepare the context for summarization
-    prompt = f"""
-    Please summarize the following text:
-    
-    {text}
-    """
+    return generation.summarize_text_with_llama(text, llm)
 
-    # Use the locally running LLaMA model to generate the summary
-    response = llm(prompt)
 
-    # Extract and return the generated summary
-    summary = response.strip()
-    return summary
+def stream_summary_with_llama(text):
+    """
+    Streams the summary's text chunks as the model generates them.
+    """
+    listener = CachedCompletionListener()
+    stream = generation.stream_summary_with_llama(text, llm, callbacks=[listener])
+    return MeteredStream(stream, "summary", generation_stats, started=time.perf_counter(), listener=listener)
 
 # <------------------------------------------------------Interactive Q&A Functionality----------------------------------->
 
-def answer_question_with_llama(question):
+def answer_question_with_llama(question, chat_history=None, scope=None):
     """
     Answers a question using the locally installed LLaMA model with Ollama.
+    chat_history is the session's list of messages; it is extended with this turn.
+    scope limits retrieval to some documents, a page range or a sheet.
     """
+    return "".join(stream_answer_with_llama(question, chat_history, scope))
+
+
+def stream_answer_with_llama(question, chat_history=None, scope=None):
+    """
+    Streaming version of answer_question_with_llama: yields the answer's text as the model
+    produces it. History and the answer cache are updated once the answer is complete.
+    """
+    # Time to first token is measured from here, so rewriting, retrieval and re-ranking count
+    submitted = time.perf_counter()
+
     # Guard clause for empty/None question
     if not question:
-        return "Please provide a question to answer."
+        yield "Please provide a question to answer."
+        return
     
     # Guard clause for vectorstore
     if not vectorstore:
-        return "No documents indexed for retrieval. Please upload files first."
-
-    try:
-        # Retrieve relevant documents
-        retriever = vectorstore.as_retriever(search_type="similarity", search_kwargs={"k": 3})
-        retrieved_docs = retriever.get_relevant_documents(question)
-
-        if not retrieved_docs:
-            return "No relevant documents found for your question."
-        
-        prompt = ChatPromptTemplate.from_messages([
-            MessagesPlaceholder(variable_name="chat_history"),
-            ("user", "{input}"),
-            ("user", "Given the above conversation, generate a search query to look up in order to get information relevant to the conversation")
-        ])
-
-        history_retriever_chain = create_history_aware_retriever(llm, retriever, prompt)
-
-        answer_prompt = ChatPromptTemplate.from_messages([
-            ("system", "Answer the user's questions based on the below context:\n\n{context}"),
-            MessagesPlaceholder(variable_name="chat_history"),
-            ("user", "{input}")
-        ])
-
-        # Create the document processing chain
-        document_chain = create_stuff_documents_chain(llm, answer_prompt)
-
-        # Create the final conversational retrieval chain
-        conversational_retrieval_chain = create_retrieval_chain(
-            history_retriever_chain, 
-            document_chain
-        )
+        yield "No documents indexed for retrieval. Please upload files first."
+        return
 
-        # Initialize chat history if not exists
+    if chat_history is None:
         chat_history = []
 
-        # Invoke the chain with the question
-        response = conversational_retrieval_chain.invoke({
-            'chat_history': chat_history,
-            "input": question
-        })
+    try:
+        # A close enough question was already answered against the same documents. Follow-ups
+        # depend on the conversation and scoped questions on the scope, so only standalone,
+        # unscoped questions use the cache
+        corpus_version = knowledge_base.version
+        use_answer_cache = not chat_history and not scope
+        if use_answer_cache:
+            question_vector = knowledge_base.query_embeddings.embed_query(question)
+            # "Regenerate LLM responses" answers afresh, still refreshing the cache afterwards
+            cached_answer = None if bypass_llm_cache else answer_cache.lookup(question_vector, corpus_version)
+            if cached_answer is not None:
+                served = time.perf_counter() - submitted
+                generation_stats.record("qa", served, 0, served, source="answer cache")
+                append_turn(chat_history, question, cached_answer)
+                yield cached_answer
+                return
+
+        # One retrieval pass; the query is only rewritten by the LLM when there is history
+        listener = CachedCompletionListener()
+        response = workspace.qa_engine(build_qa_engine).stream(
+            question, chat_history, scope, bypass_cache=bypass_llm_cache, callbacks=[listener]
+        )
+        if response["answer"] is None:
+            yield "No relevant documents found for your question."
+            return
 
-        # Update chat history
-        chat_history.append((
-            HumanMessage(content=question), 
-            AIMessage(content=response["answer"])
-        ))
+        answer = MeteredStream(response["answer"], "qa", generation_stats, started=submitted, listener=listener)
+        yield from answer
 
-        return response['answer']
+        if use_answer_cache:
+            answer_cache.store(question_vector, answer.text, corpus_version)
+        append_turn(chat_history, question, answer.text)
 
     except Exception as e:
-        return f"An error occurred while processing your question: {str(e)}"
+        yield f"An error occurred while processing your question: {str(e)}"
 
 
 # <-------------------------------------------- Word Cloud Function---------------------------------->
@@ -249,24 +318,26 @@ def generate_description_with_ollama(entity_text, entity_type, context):
     """
     Generates concise descriptions for entities using Ollama.
     """
-    prompt = f"""
-    Entity: {entity_text} ({entity_type})
-    Context: {context}
-    Task: Provide a single-sentence refined description of this entity.
+    return generation.generate_description_with_ollama(entity_text, entity_type, context, llm)
+
+
+def stream_description_with_ollama(entity_text, entity_type, context):
+    """
+    Streams an entity description's text chunks as the model generates them.
     """
+    listener = CachedCompletionListener()
+    stream = generation.stream_description_with_ollama(entity_text, entity_type, context, llm, callbacks=[listener])
+    return MeteredStream(stream, "highlight", generation_stats, started=time.perf_counter(), listener=listener)
 
-    # Use the locally installed Ollama model
-    response = llm(prompt)
-    return response.strip()
 
-def extract_highlights_with_ollama(text):
+def find_highlight_entities(text):
     """
-    Extracts concise highlights and generates descriptions using Ollama 3.2.
+    Returns (entity text, entity type, context sentence) for each distinct named entity worth highlighting.
     """
     entities = ner_model(text)
     valid_entity_types = {"PER", "ORG", "LOC", "GPE", "DATE"}
     seen_entities = set()
-    highlights = []
+    highlight_entities = []
 
     for entity in entities:
         entity_text = entity["word"]
@@ -278,79 +349,37 @@ def extract_highlights_with_ollama(text):
             # Extract context sentences (1-2 sentences only)
             context_sentences = [s for s in sent_tokenize(text) if entity_text in s]
             context = " ".join(context_sentences[:1]) if context_sentences else "No detailed context available."
+            highlight_entities.append((entity_text, entity_type, context))
+
+    return highlight_entities
 
-            # Generate concise description
-            refined_description = generate_description_with_ollama(entity_text, entity_type, context)
-            highlights.append(f"{entity_text} ({entity_type}) - {refined_description}")
+
+def extract_highlights_with_ollama(text):
+    """
+    Extracts concise highlights and generates descriptions using Ollama 3.2.
+    """
+    highlights = []
+    for entity_text, entity_type, context in find_highlight_entities(text):
+        # Generate concise description
+        refined_description = generate_description_with_ollama(entity_text, entity_type, context)
+        highlights.append(f"{entity_text} ({entity_type}) - {refined_description}")
 
     return highlights
 
 #<---------------------------------------------------Quiz---------------------------------------->
 import re
 import streamlit as st
+from streamlit import runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 
 
-# Function to parse quiz questions
-def parse_quiz(response):
-    quiz_questions = []
-    try:
-        # Split the response into individual questions using regex
-        questions = re.split(r"(?=Question \d+:)", response)
-
-        for question in questions:
-            if not question.strip():
-                continue
-
-            # Extract the question text
-            question_match = re.search(r"Question \d+: (.+)", question)
-            question_text = question_match.group(1).strip() if question_match else None
-
-            # Extract choices
-            choices = {}
-            choice_matches = re.findall(r"([A-D])\) (.+)", question)
-
-            for choice in choice_matches:
-                choices[choice[0]] = choice[1].strip()
-
-            # Extract the answer
-            answer_match = re.search(r"Answer: ([A-D])", question)
-            correct_answer = answer_match.group(1).strip() if answer_match else None
-
-            if question_text and choices and correct_answer:
-                quiz_questions.append({
-                    "question": question_text,
-                    "choices": [f"{key}) {value}" for key, value in choices.items()],
-                    "answer": correct_answer
-                })
-
-        return quiz_questions
-
-    except Exception as e:
-        raise ValueError(f"Error while parsing quiz questions: {e}")
 def generate_quiz_questions(document_content, num_questions=5):
     """
     Generate quiz questions based on the document content.
     """
-    # Construct the prompt for the LLM
-    question_prompt = (
-        f"Generate {num_questions} multiple-choice quiz questions from the following text:\n\n{document_content}\n\n"
-        "Format the output as:\n"
-        "Question [number]: [Your question here]\n"
-        "Choices:\n"
-        "A) [Option A]\n"
-        "B) [Option B]\n"
-        "C) [Option C]\n"
-        "D) [Option D]\n"
-        "Answer: [Correct option letter]\n"
-        "Ensure all questions are relevant and based on the text provided."
-    )
-
-    # Get the response from the LLM
-    response = llm(question_prompt)
-
     # Validate and parse the structured response
     try:
-        quiz_questions = parse_quiz(response)
+        quiz_questions = generation.generate_quiz_questions(document_content, num_questions, llm)
         return quiz_questions
     except Exception as e:
         st.error(f"Error parsing quiz questions: {e}")
@@ -415,13 +444,89 @@ def display_quiz_with_checkboxes(quiz_questions):
 st.sidebar.header("Welcome!")
 st.sidebar.info("Upload corporate training documents, explore their contents, get concise summaries, generate word clouds, and ask interactive questions!")
 
+new_workspace = st.sidebar.text_input(
+    "Workspace", st.session_state.workspace, help="Uploads and answers are only shared within a workspace. "
+    f"Existing: {', '.join(workspace_pool.names())}"
+)
+if workspace_name(new_workspace) != st.session_state.workspace:
+    st.session_state.workspace = workspace_name(new_workspace)
+    # Conversations do not carry over between workspaces
+    st.session_state.messages = []
+    st.session_state.chat_history = []
+    st.session_state.pop("bulk_answers", None)
+    st.rerun()
+for kind, kind_stats in generation_stats.summary().items():
+    if kind_stats["time_to_first_token"] is None:
+        continue
+    if kind_stats["tokens_per_second"] is None:
+        st.sidebar.caption(
+            f"{kind}: {kind_stats['requests']} requests, served after {kind_stats['time_to_first_token']:.2f}s"
+        )
+    else:
+        st.sidebar.caption(
+            f"{kind}: {kind_stats['requests']} requests, first token after {kind_stats['time_to_first_token']:.2f}s, "
+            f"{kind_stats['tokens_per_second']:.1f} tokens/s"
+        )
+gateway_stats = get_gateway().stats()
+st.sidebar.caption(
+    f"LLM: {gateway_stats['in_flight']}/{gateway_stats['max_concurrency']} in flight, {gateway_stats['waiting']} waiting, "
+    f"{gateway_stats['rejected']} turned away, {gateway_stats['coalesced']} saved by sharing identical requests"
+)
+rerank_stats = reranker.stats()
+st.sidebar.caption(
+    f"Re-ranking: {rerank_stats['reranked']} questions re-ranked, {rerank_stats['skipped']} skipped under load"
+)
+response_cache = get_response_cache()
+if response_cache is not None:
+    response_cache_stats = response_cache.stats()
+    st.sidebar.caption(
+        f"LLM response cache: {response_cache_stats['hits']} hits / {response_cache_stats['misses']} misses "
+        f"({response_cache_stats['hit_rate']:.0%}), {response_cache_stats['entries']} stored"
+    )
+pool_stats = workspace_pool.stats()
+st.sidebar.caption(
+    f"{len(pool_stats['loaded'])} workspaces loaded, ~{pool_stats['memory_bytes'] / 2**20:.0f} MB "
+    f"of {pool_stats['budget_bytes'] / 2**20:.0f} MB"
+)
+
 with tabs[0]:
     st.header("Upload Files")
     uploaded_files = st.file_uploader("Upload corporate documents (PDF, PPTX, TXT, XLSX)", 
-                                      type=["pdf", "pptx", "txt", "xlsx"], accept_multiple_files=True)
+                                      type=["pdf", "pptx", "txt", "xlsx"], accept_multiple_files=True,
+                                      key=f"uploads_{st.session_state.workspace}")
     if uploaded_files:
-        process_files(uploaded_files)
-        st.success("Files processed successfully!")
+        # Parsing and embedding run in the background; the other tabs stay usable. Rerun so the
+        # progress fragment, defined before the job existed, starts polling it
+        if ingestion_worker.submit(uploaded_files) is not None:
+            st.rerun()
+    # Only files still in the uploader can be re-submitted
+    failed_files = [name for name in ingestion_worker.failed_files() if name in {file.name for file in uploaded_files or []}]
+    if failed_files:
+        st.warning(
+            f"Failed to index: {', '.join(failed_files)}. They are retried on later reruns with increasing "
+            f"delays, up to {config.INGEST_MAX_ATTEMPTS} attempts."
+        )
+        if st.button("Retry failed uploads now"):
+            ingestion_worker.retry_failed()
+            st.rerun()
+    show_ingestion_progress()
+
+    index_stats = knowledge_base.index_stats()
+    if index_stats:
+        storage = index_stats["quantization"] + (" + exact re-scoring" if index_stats["rescore"] else "")
+        st.caption(
+            f"Index: {index_stats['kind']} over {index_stats['vectors']} vectors, storage {storage}, "
+            f"~{index_stats['bytes_per_vector']} bytes/vector"
+        )
+
+    if document_store:
+        with st.expander("Manage indexed documents"):
+            names_to_delete = st.multiselect("Select documents to remove", [doc.metadata["name"] for doc in document_store])
+            if st.button("Remove selected documents") and names_to_delete:
+                for name in names_to_delete:
+                    knowledge_base.delete_document(name)
+                knowledge_base.save()
+                st.rerun()
 
 with tabs[1]:
     st.header("Original Context")
@@ -437,9 +542,11 @@ with tabs[2]:
     if document_store:
         for doc in document_store:
             st.write(f"### {doc.metadata['name']}")
-            summary = summarize_text_with_llama(doc.page_content)
             st.write("### Summary:")
-            st.write(summary)
+            # Tokens appear as they are generated instead of after the whole summary
+            summary_stream = stream_summary_with_llama(doc.page_content)
+            st.write_stream(summary_stream)
+            st.caption(summary_stream.describe())
     else:
         st.info("Please upload files to summarize.")
 
@@ -454,6 +561,27 @@ with tabs[3]:
     # Initialize session state for messages if not exists
     if 'messages' not in st.session_state:
         st.session_state.messages = []
+    # LangChain messages of this session's conversation, used to resolve follow-up questions
+    if 'chat_history' not in st.session_state:
+        st.session_state.chat_history = []
+
+    # Optional scope: search only the picked documents, and a page range or sheet of a single one
+    scope = {}
+    with st.expander("Limit search to specific documents"):
+        scope_names = st.multiselect("Documents", [doc.metadata["name"] for doc in document_store], key="qa_scope_names")
+        if scope_names:
+            scope["names"] = scope_names
+        if len(scope_names) == 1:
+            options = knowledge_base.scope_options(scope_names[0])
+            if len(options["pages"]) > 1:
+                scope["pages"] = st.slider(
+                    "Pages", options["pages"][0], options["pages"][-1], (options["pages"][0], options["pages"][-1]),
+                    key="qa_scope_pages",
+                )
+            elif options["sheets"]:
+                sheet = st.selectbox("Sheet", ["All sheets"] + options["sheets"], key="qa_scope_sheet")
+                if sheet != "All sheets":
+                    scope["sheet"] = sheet
 
     # Display existing messages
     for message in st.session_state.messages:
@@ -469,12 +597,44 @@ with tabs[3]:
             st.markdown(prompt)
 
         with st.chat_message('assistant'):
-            with st.spinner('Generating response...'):
-                result = answer_question_with_llama(prompt)
-                st.write(result)
+            # Tokens are written into the bubble as the model produces them
+            result = st.write_stream(stream_answer_with_llama(prompt, st.session_state.chat_history, scope))
 
         st.session_state.messages.append({'role': '🤖', 'content': result})
 
+    answer_stats = answer_cache.stats()
+    embedding_stats = knowledge_base.query_embeddings.stats()
+    st.caption(
+        f"Answer cache: {answer_stats['hits']} hits / {answer_stats['misses']} misses · "
+        f"Query embedding cache: {embedding_stats['hits']} hits / {embedding_stats['misses']} misses"
+    )
+
+    with st.expander("Bulk Q&A from a question list"):
+        question_file = st.file_uploader("Upload a CSV or XLSX with a 'question' column", type=["csv", "xlsx"], key="bulk_questions")
+        if question_file is not None and st.button("Answer all questions"):
+            questions = read_questions(question_file.name, question_file.getvalue())
+            if not questions:
+                st.warning("No questions found in the uploaded file.")
+            else:
+                progress = st.progress(0.0, text=f"Answering {len(questions)} questions...")
+                started = time.perf_counter()
+                st.session_state.bulk_answers = answer_questions(
+                    knowledge_base, workspace.qa_engine(build_qa_engine), questions, reranker=reranker,
+                    k=config.CONTEXT_CANDIDATES,
+                    on_answer=lambda done, total: progress.progress(done / total, text=f"Answered {done} of {total} questions"),
+                )
+                st.session_state.bulk_seconds = time.perf_counter() - started
+        if "bulk_answers" in st.session_state:
+            bulk_answers = st.session_state.bulk_answers
+            st.caption(
+                f"{len(bulk_answers)} questions in {st.session_state.bulk_seconds:.1f}s "
+                f"({len(bulk_answers) / max(st.session_state.bulk_seconds, 1e-9):.2f} questions/s)"
+            )
+            st.dataframe(bulk_answers)
+            st.download_button(
+                "Download answers (CSV)", bulk_answers.to_csv(index=False).encode("utf-8"), "answers.csv", "text/csv"
+            )
+
 
 with tabs[6]:
     st.header("Word Cloud")
@@ -495,10 +655,11 @@ with tabs[7]:
     if document_store:
         for doc in document_store:
             st.subheader(f"Document: {doc.metadata['name']}")
-            highlights = extract_highlights_with_ollama(doc.page_content)
-            if highlights:
-                for i, highlight in enumerate(highlights, start=1):
-                    st.markdown(f"**{i}. {highlight}**")
+            highlight_entities = find_highlight_entities(doc.page_content)
+            if highlight_entities:
+                for i, (entity_text, entity_type, context) in enumerate(highlight_entities, start=1):
+                    st.markdown(f"**{i}. {entity_text} ({entity_type})**")
+                    st.write_stream(stream_description_with_ollama(entity_text, entity_type, context))
             else:
                 st.write("No significant entities or highlights found.")
     else:
@@ -0,0 +1,104 @@
+from collections import defaultdict
+
+import numpy as np
+
+
+class MetadataIndex:
+    """
+    Precomputed chunk-id sets per document, page and sheet, plus each chunk's position in the
+    FAISS index. A search scope resolves to the FAISS positions of the matching chunks, which
+    are handed to FAISS as an IDSelector so the filter is applied inside the ANN search.
+    Tombstoned chunks are dropped right away, so they are never selected either.
+    Not thread-safe on its own; KnowledgeBase guards it with its lock.
+
+    A scope is a dict with any of:
+        "names": document names to search,
+        "pages": inclusive (first, last) page range within those documents, or
+        "sheet": spreadsheet sheet title.
+    """
+
+    def __init__(self):
+        # chunk id -> position in the FAISS index
+        self.positions = {}
+        # document name -> chunk ids
+        self.by_document = defaultdict(set)
+        # document name -> page number -> chunk ids
+        self.by_page = defaultdict(lambda: defaultdict(set))
+        # document name -> sheet title -> chunk ids
+        self.by_sheet = defaultdict(lambda: defaultdict(set))
+        # chunk id -> metadata, to undo the entries above
+        self.metadata = {}
+
+    def __len__(self):
+        return len(self.positions)
+
+    def add(self, chunk_id, position, metadata):
+        name = metadata.get("name")
+        self.positions[chunk_id] = position
+        self.metadata[chunk_id] = metadata
+        self.by_document[name].add(chunk_id)
+        if "page" in metadata:
+            self.by_page[name][metadata["page"]].add(chunk_id)
+        if "sheet" in metadata:
+            self.by_sheet[name][metadata["sheet"]].add(chunk_id)
+
+    def remove(self, chunk_id):
+        metadata = self.metadata.pop(chunk_id, None)
+        if metadata is None:
+            return
+        del self.positions[chunk_id]
+        name = metadata.get("name")
+        self._discard(self.by_document, name, chunk_id)
+        if "page" in metadata:
+            self._discard(self.by_page[name], metadata["page"], chunk_id)
+            if not self.by_page[name]:
+                del self.by_page[name]
+        if "sheet" in metadata:
+            self._discard(self.by_sheet[name], metadata["sheet"], chunk_id)
+            if not self.by_sheet[name]:
+                del self.by_sheet[name]
+
+    def reposition(self, index_to_docstore_id):
+        """
+        Re-reads chunk positions after a compaction renumbered the FAISS index.
+        """
+        self.positions = {
+            chunk_id: position for position, chunk_id in index_to_docstore_id.items() if chunk_id in self.metadata
+        }
+
+    def pages(self, name):
+        return sorted(self.by_page.get(name, {}))
+
+    def sheets(self, name):
+        return sorted(self.by_sheet.get(name, {}))
+
+    def select(self, scope):
+        """
+        Returns the set of chunk ids matching a scope.
+        """
+        names = scope.get("names") or list(self.by_document)
+        pages = scope.get("pages")
+        sheet = scope.get("sheet")
+        selected = set()
+        for name in names:
+            if pages is not None:
+                first, last = pages
+                for page, chunk_ids in self.by_page.get(name, {}).items():
+                    if first <= page <= last:
+                        selected |= chunk_ids
+            elif sheet is not None:
+                selected |= self.by_sheet.get(name, {}).get(sheet, set())
+            else:
+                selected |= self.by_document.get(name, set())
+        return selected
+
+    def select_positions(self, chunk_ids):
+        return np.fromiter((self.positions[chunk_id] for chunk_id in chunk_ids), dtype=np.int64, count=len(chunk_ids))
+
+    @staticmethod
+    def _discard(groups, key, chunk_id):
+        chunk_ids = groups.get(key)
+        if chunk_ids is not None:
+            chunk_ids.discard(chunk_id)
+            if not chunk_ids:
+                del groups[key]
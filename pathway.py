@@ -5,6 +5,8 @@ from langchain_community.vectorstores import FAISS  # Updated imports
 from langchain.schema import Document
 from langchain.chains import RetrievalQA
 from langchain_community.llms import OpenAI, Ollama  # Updated imports
+import generation
+from generation import parse_and_clean_learning_path
 from pptx import Presentation
 import pandas as pd
 from sentence_transformers import SentenceTransformer
@@ -20,6 +22,7 @@ import matplotlib.pyplot as plt
 from transformers import BartForConditionalGeneration, BartTokenizer
 from difflib import HtmlDiff, SequenceMatcher
 import tempfile
+from extraction import extract_uploads
 from transformers import AutoModelForCausalLM, AutoTokenizer, AutoModelForTokenClassification
 from transformers import pipeline
 import nltk
@@ -45,7 +48,7 @@ st.title("Corporate Training Knowledge Hub")
 
 
 # Initialize the LLaMA model using Ollama
-llm = Ollama(model="llama3.2")  # Replace with your locally installed LLaMA model
+llm = generation.get_llm()
 
 
 # Load embedding model for document processing
@@ -60,44 +63,15 @@ tabs = st.tabs(["Upload Files", "Original Context", "Document Summarization", "I
 # <--------------------------------------------------Upload and process files------------------------------------->
 def process_files(uploaded_files):
     global vectorstore
-    for uploaded_file in uploaded_files:
-        file_type = uploaded_file.name.split(".")[-1]
-        combined_content = ""
-        document = None
-
-        with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-            temp_file.write(uploaded_file.read())
-            temp_file_path = temp_file.name
-
-        if file_type == "pdf":
-            loader = PyPDFLoader(temp_file_path)
-            all_pages = loader.load()
-            combined_content = " ".join([page.page_content for page in all_pages])
-            document = Document(page_content=combined_content, metadata={"name": uploaded_file.name})
-
-        elif file_type == "pptx":
-            presentation = Presentation(temp_file_path)
-            for slide in presentation.slides:
-                for shape in slide.shapes:
-                    if shape.has_text_frame:
-                        combined_content += shape.text_frame.text + " "
-            document = Document(page_content=combined_content, metadata={"name": uploaded_file.name})
-
-        elif file_type == "txt":
-            with open(temp_file_path, "r", encoding="utf-8") as file:
-                combined_content = file.read()
-            document = Document(page_content=combined_content, metadata={"name": uploaded_file.name})
-
-        elif file_type == "xlsx":
-            excel_data = pd.read_excel(temp_file_path)
-            combined_content = excel_data.to_string(index=False)
-            document = Document(page_content=combined_content, metadata={"name": uploaded_file.name})
-
-        if document is None:
-            st.warning(f"File type '{file_type}' is not supported.")
-            os.remove(temp_file_path)
+    uploads = [(uploaded_file.name, uploaded_file.getbuffer()) for uploaded_file in uploaded_files]
+
+    # Parse files in parallel; results arrive in completion order
+    for result in extract_uploads(uploads):
+        if result.error is not None:
+            st.warning(f"Could not process '{result.name}': {result.error}")
             continue
 
+        document = result.document
         document_store.append(document)
         texts = [document.page_content]
         if vectorstore is None:
@@ -105,8 +79,6 @@ def process_files(uploaded_files):
         else:
             vectorstore.add_texts(texts)
 
-        os.remove(temp_file_path)
-
 # <----------------------------------------------------Summarization function------------------------------------->
 
 def summarize_text_with_llama(text):
@@ -318,58 +290,15 @@ def extract_meaningful_keywords_with_llama(text, num_keywords=10):
     Extracts structured, course-like keywords using LLaMA.
     Filters to ensure actionable topics are returned.
     """
-    prompt = f"""
-    From the following text, identify up to {num_keywords} concise, well-defined course topics.
-    Only return short, actionable topics like "Python," "Machine Learning," "Deep Learning," etc.
-    Avoid explanations, summaries, or full sentences.
-    
-    {text}
-    """
-
-    # Use the LLaMA model to generate the keywords
-    response = llm(prompt)
-
-    # Clean and extract keywords from the response
-    keywords = [keyword.strip() for keyword in response.split(",") if len(keyword.strip()) > 0]
-    return keywords[:num_keywords]  # Limit to the top num_keywords
+    return generation.extract_meaningful_keywords_with_llama(text, num_keywords, llm)
 
 
 def generate_learning_path_with_llama(keyword):
     """
     Generates a structured learning path for the given keyword using the LLaMA model.
     """
-    prompt = f"""
-    Create a structured learning roadmap for the topic '{keyword}' divided into three levels: Beginner, Intermediate, and Advanced.
-    Each level should have 3-5 concise subtopics or key concepts to learn. Do not include explanations or long descriptions.
-    Example format:
-    Beginner: Topic 1, Topic 2
-    Intermediate: Topic 3, Topic 4
-    Advanced: Topic 5, Topic 6
-    """
+    return generation.generate_learning_path_with_llama(keyword, llm)
 
-    # Use the LLaMA model to generate the learning path
-    response = llm(prompt)
-
-    # Return the structured learning path
-    return response.strip()
-
-
-def parse_and_clean_learning_path(learning_path):
-    """
-    Cleans and parses the learning path text into a hierarchical format for visualization.
-    Handles irregular responses and ensures proper structure.
-    """
-    levels = {"Beginner": [], "Intermediate": [], "Advanced": []}
-
-    # Parse the LLaMA response and map to levels
-    for line in learning_path.split("\n"):
-        if line.lower().startswith("beginner"):
-            levels["Beginner"] = [topic.strip() for topic in line[len("Beginner:"):].split(",") if topic.strip()]
-        elif line.lower().startswith("intermediate"):
-            levels["Intermediate"] = [topic.strip() for topic in line[len("Intermediate:"):].split(",") if topic.strip()]
-        elif line.lower().startswith("advanced"):
-            levels["Advanced"] = [topic.strip() for topic in line[len("Advanced:"):].split(",") if topic.strip()]
-    return levels
 
 def visualize_roadmap_with_fallback(keyword, levels):
     """
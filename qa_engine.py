@@ -0,0 +1,105 @@
+from langchain.chains.combine_documents import create_stuff_documents_chain
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+
+import config
+
+
+class QAEngine:
+    """
+    Conversational question answering over a retriever. Prompts and chains are built once,
+    so the app keeps one engine per index version instead of rebuilding them per question.
+
+    Each question costs one retrieval and one answer call. The history-aware query rewrite
+    only runs when there is history to resolve follow-up questions against. With a packer,
+    the retrieved chunks are de-duplicated and fitted to a token budget before answering.
+
+    Engines are shared by every session, so per-session LLM settings are not baked into the
+    chains: bypass_cache is passed per call as the LLM's configurable "bypass_cache" field
+    (ignored by LLMs that do not declare it).
+    """
+
+    def __init__(self, llm, retriever, packer=None):
+        self.retriever = retriever
+        self.packer = packer
+
+        rewrite_prompt = ChatPromptTemplate.from_messages([
+            MessagesPlaceholder(variable_name="chat_history"),
+            ("user", "{input}"),
+            ("user", "Given the above conversation, generate a search query to look up in order to get information relevant to the conversation")
+        ])
+        self.rewrite_chain = rewrite_prompt | llm | StrOutputParser()
+
+        answer_prompt = ChatPromptTemplate.from_messages([
+            ("system", "Answer the user's questions based on the below context:\n\n{context}"),
+            MessagesPlaceholder(variable_name="chat_history"),
+            ("user", "{input}")
+        ])
+        self.document_chain = create_stuff_documents_chain(llm, answer_prompt)
+
+    def search_query(self, question, chat_history, bypass_cache=False):
+        """
+        Returns the query to retrieve with: the question itself, or an LLM rewrite of it
+        that folds in the conversation so far.
+        """
+        if not chat_history:
+            return question
+        rewritten = self.rewrite_chain.invoke(
+            {"chat_history": chat_history, "input": question}, config=_llm_config(bypass_cache)
+        )
+        return rewritten.strip() or question
+
+    def answer(self, question, chat_history=None, scope=None, bypass_cache=False):
+        """
+        Returns {"answer": str or None, "context": [Document]}. The answer is None when
+        retrieval found nothing, in which case the LLM is not called. scope limits retrieval
+        to some documents, pages or a sheet.
+        """
+        chat_history = chat_history or []
+        retriever = self.retriever.scoped(scope)
+        context = retriever.invoke(self.search_query(question, chat_history, bypass_cache))
+        if not context:
+            return {"answer": None, "context": []}
+        return {"answer": self.generate(question, context, chat_history, bypass_cache), "context": context}
+
+    def stream(self, question, chat_history=None, scope=None, bypass_cache=False, callbacks=None):
+        """
+        Like answer, but "answer" is an iterator over the answer's text chunks as the LLM
+        produces them (None when retrieval found nothing). callbacks are LangChain callback
+        handlers for the answer call.
+        """
+        chat_history = chat_history or []
+        retriever = self.retriever.scoped(scope)
+        context = retriever.invoke(self.search_query(question, chat_history, bypass_cache))
+        if not context:
+            return {"answer": None, "context": []}
+        if self.packer is not None:
+            context = self.packer.pack(context)
+        chunks = self.document_chain.stream(
+            {"context": context, "chat_history": chat_history, "input": question},
+            config=_llm_config(bypass_cache, callbacks),
+        )
+        return {"answer": chunks, "context": context}
+
+    def generate(self, question, context, chat_history=None, bypass_cache=False):
+        """
+        Answers a question from already retrieved chunks with a single LLM call.
+        """
+        if self.packer is not None:
+            context = self.packer.pack(context)
+        return self.document_chain.invoke(
+            {"context": context, "chat_history": chat_history or [], "input": question}, config=_llm_config(bypass_cache)
+        )
+
+
+def _llm_config(bypass_cache, callbacks=None):
+    return {"configurable": {"bypass_cache": bypass_cache}, "callbacks": callbacks}
+
+
+def append_turn(chat_history, question, answer):
+    """
+    Adds a question/answer pair to a session's history, keeping the last QA_HISTORY_TURNS turns.
+    """
+    chat_history.extend([HumanMessage(content=question), AIMessage(content=answer)])
+    del chat_history[:-2 * config.QA_HISTORY_TURNS]
@@ -0,0 +1,111 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import config
+
+
+def normalize_query(text):
+    """
+    Case- and whitespace-insensitive form of a question, used as the cache key.
+    """
+    return " ".join(text.lower().split())
+
+
+# <--------------------------------------------------Query embeddings------------------------------------->
+class QueryEmbeddingCache:
+    """
+    LRU of normalised query text -> embedding, so a repeated question skips the MiniLM encode.
+    """
+
+    def __init__(self, embedding_model, max_entries=None):
+        self.embedding_model = embedding_model
+        self.max_entries = max_entries or config.QUERY_EMBEDDING_CACHE_SIZE
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def embed_query(self, text):
+        key = normalize_query(text)
+        with self.lock:
+            vector = self.entries.get(key)
+            if vector is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return vector
+            self.misses += 1
+
+        vector = self.embedding_model.embed_query(key)
+        with self.lock:
+            self.entries[key] = vector
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return vector
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries)}
+
+
+# <--------------------------------------------------Semantic answers------------------------------------->
+class SemanticAnswerCache:
+    """
+    Remembers answers by question embedding. A new question gets a stored answer when its
+    cosine similarity to a cached question reaches the threshold and the corpus version the
+    answer was generated against is still current; any change to the indexed documents
+    empties the cache. Embeddings are unit-normalised, so cosine similarity is a dot product.
+    """
+
+    def __init__(self, threshold=None, max_entries=None):
+        self.threshold = config.ANSWER_CACHE_THRESHOLD if threshold is None else threshold
+        self.max_entries = max_entries or config.ANSWER_CACHE_SIZE
+        self.version = None
+        # Ring buffer of question embeddings, allocated on the first store once the dimension
+        # is known, so a lookup is a single matrix-vector product
+        self.vectors = None
+        self.answers = [None] * self.max_entries
+        self.count = 0
+        self.next = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, vector, version):
+        """
+        Returns the cached answer for a close-enough question, or None.
+        """
+        vector = np.asarray(vector, dtype=np.float32)
+        with self.lock:
+            self._check_version(version)
+            if self.count:
+                similarities = self.vectors[:self.count] @ vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    self.hits += 1
+                    return self.answers[best]
+            self.misses += 1
+            return None
+
+    def store(self, vector, answer, version):
+        vector = np.asarray(vector, dtype=np.float32)
+        with self.lock:
+            self._check_version(version)
+            if self.vectors is None:
+                self.vectors = np.empty((self.max_entries, len(vector)), dtype=np.float32)
+            # Once full, the oldest entry is overwritten
+            self.vectors[self.next] = vector
+            self.answers[self.next] = answer
+            self.next = (self.next + 1) % self.max_entries
+            self.count = min(self.count + 1, self.max_entries)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": self.count}
+
+    def _check_version(self, version):
+        if version != self.version:
+            self.version = version
+            # The buffer is kept; resetting the counters is enough to empty the cache
+            self.answers = [None] * self.max_entries
+            self.count = 0
+            self.next = 0
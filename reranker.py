@@ -0,0 +1,142 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from sentence_transformers import CrossEncoder
+
+import config
+
+
+class Reranker:
+    """
+    Re-orders retrieved chunks with a cross-encoder that reads the query and chunk together.
+    All uncached (query, chunk) pairs of a question are scored in one batched forward pass,
+    and scores are kept in an LRU so repeated questions skip the model entirely.
+
+    Under load the stage is skipped, keeping the retriever's own order, whenever other questions
+    are already being re-ranked and the estimated scoring time (per-pair cost times pending
+    pairs, times the questions in flight) would exceed the latency budget. A question arriving
+    while the model is idle is always re-ranked, which keeps the per-pair estimate current.
+    Skips are counted in stats(); bulk runs use rerank_many, which is never skipped.
+    """
+
+    def __init__(self, model_name=None, budget_ms=None, cache_size=None):
+        self.model = CrossEncoder(model_name or config.RERANK_MODEL)
+        self.budget_ms = config.RERANK_BUDGET_MS if budget_ms is None else budget_ms
+        self.cache_size = cache_size or config.RERANK_CACHE_SIZE
+        # (query, chunk text digest) -> score
+        self.scores = OrderedDict()
+        self.lock = threading.Lock()
+        self.active = 0
+        # Moving average of seconds per scored pair; None until the first batch has run
+        self.seconds_per_pair = None
+        self.reranked = 0
+        self.skipped = 0
+
+    def rerank(self, query, documents, k):
+        """
+        Returns the k best documents for the query, best first.
+        """
+        if len(documents) <= 1:
+            return documents[:k]
+
+        keys = self._keys(query, documents)
+        with self.lock:
+            scores = self._cached(keys)
+            missing = [i for i, key in enumerate(keys) if key not in scores]
+            if missing and self._over_budget(len(missing)):
+                self.skipped += 1
+                return documents[:k]
+            self.active += 1
+
+        try:
+            if missing:
+                self._score({keys[i]: documents[i].page_content for i in missing}, scores)
+        finally:
+            with self.lock:
+                self.active -= 1
+                self.reranked += 1
+        return self._best(documents, keys, scores, k)
+
+    def rerank_many(self, queries, document_lists, k):
+        """
+        Batched rerank for bulk runs: the uncached (query, chunk) pairs of all questions are
+        scored in one predict call. A bulk run is a throughput job, so it is never skipped
+        for the latency budget. Returns one list of the k best documents per query.
+        """
+        all_keys = [self._keys(query, documents) for query, documents in zip(queries, document_lists)]
+        with self.lock:
+            scores = self._cached([key for keys in all_keys for key in keys])
+            self.active += 1
+
+        try:
+            pending = {}
+            for keys, documents in zip(all_keys, document_lists):
+                if len(documents) <= 1:
+                    continue
+                for key, document in zip(keys, documents):
+                    if key not in scores:
+                        pending[key] = document.page_content
+            if pending:
+                self._score(pending, scores)
+        finally:
+            with self.lock:
+                self.active -= 1
+                self.reranked += len(all_keys)
+        return [
+            self._best(documents, keys, scores, k) for keys, documents in zip(all_keys, document_lists)
+        ]
+
+    def _keys(self, query, documents):
+        query = " ".join(query.lower().split())
+        return [(query, hashlib.sha1(document.page_content.encode("utf-8")).hexdigest()) for document in documents]
+
+    def _cached(self, keys):
+        # Called under the lock
+        scores = {key: self.scores[key] for key in keys if key in self.scores}
+        for key in scores:
+            self.scores.move_to_end(key)
+        return scores
+
+    def _score(self, pending, scores):
+        """
+        Scores {key: chunk text} in one batched forward pass into scores and the LRU.
+        """
+        start = time.perf_counter()
+        batch_scores = self.model.predict(
+            [(key[0], text) for key, text in pending.items()], batch_size=config.RERANK_BATCH_SIZE
+        )
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self._record_timing(elapsed / len(pending))
+            for key, score in zip(pending, batch_scores):
+                scores[key] = float(score)
+                self.scores[key] = float(score)
+            while len(self.scores) > self.cache_size:
+                self.scores.popitem(last=False)
+
+    @staticmethod
+    def _best(documents, keys, scores, k):
+        if len(documents) <= 1:
+            return documents[:k]
+        order = sorted(range(len(documents)), key=lambda i: scores[keys[i]], reverse=True)
+        return [documents[i] for i in order[:k]]
+
+    def stats(self):
+        with self.lock:
+            return {"reranked": self.reranked, "skipped": self.skipped}
+
+    def _over_budget(self, pairs):
+        # Only skip under load: an idle model always runs, so one slow (e.g. warm-up) batch
+        # cannot switch re-ranking off for good
+        if self.budget_ms <= 0 or self.seconds_per_pair is None or not self.active:
+            return False
+        estimate_ms = self.seconds_per_pair * pairs * (self.active + 1) * 1000
+        return estimate_ms > self.budget_ms
+
+    def _record_timing(self, seconds_per_pair):
+        if self.seconds_per_pair is None:
+            self.seconds_per_pair = seconds_per_pair
+        else:
+            self.seconds_per_pair = 0.8 * self.seconds_per_pair + 0.2 * seconds_per_pair
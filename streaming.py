@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import deque
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+class GenerationStats:
+    """
+    Time-to-first-token and tokens/s of recent LLM generations, per kind ("qa", "summary", ...).
+    Answers served from a cache (source "answer cache" or "response cache") are their own
+    category: their time to first token counts, but they say nothing about generation speed.
+    """
+
+    def __init__(self, max_records=1000):
+        self.records = deque(maxlen=max_records)
+        self.lock = threading.Lock()
+
+    def record(self, kind, time_to_first_token, tokens, seconds, source="model"):
+        with self.lock:
+            self.records.append({
+                "kind": kind if source == "model" else f"{kind} ({source})",
+                "time_to_first_token": time_to_first_token,
+                "tokens": tokens,
+                "seconds": seconds,
+                "tokens_per_second": tokens / seconds if source == "model" and seconds > 0 else None,
+            })
+
+    def summary(self):
+        """
+        Returns {kind: {"requests", "time_to_first_token", "tokens_per_second"}} with mean values;
+        tokens_per_second is None for cached categories.
+        """
+        with self.lock:
+            records = list(self.records)
+        summary = {}
+        for kind in dict.fromkeys(record["kind"] for record in records):
+            kind_records = [record for record in records if record["kind"] == kind]
+            timed = [record["time_to_first_token"] for record in kind_records if record["time_to_first_token"] is not None]
+            speeds = [record["tokens_per_second"] for record in kind_records if record["tokens_per_second"] is not None]
+            summary[kind] = {
+                "requests": len(kind_records),
+                "time_to_first_token": sum(timed) / len(timed) if timed else None,
+                "tokens_per_second": sum(speeds) / len(speeds) if speeds else None,
+            }
+        return summary
+
+
+class CachedCompletionListener(BaseCallbackHandler):
+    """
+    LangChain callback noting whether the LLM served its completion from the response cache
+    (GatewayLLM marks those chunks with generation_info {"cached": True}).
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.cached = False
+
+    def on_llm_new_token(self, token, *, chunk=None, **kwargs):
+        if chunk is not None and (chunk.generation_info or {}).get("cached"):
+            self.cached = True
+
+
+class MeteredStream:
+    """
+    Passes text chunks through unchanged while timing them. Ollama streams roughly one token per
+    chunk, so the chunk count is used as the token count. The clock starts at started (a
+    time.perf_counter() value, e.g. when the question was submitted, so rewriting, retrieval
+    and re-ranking count towards the time to first token) or else when iteration begins.
+    Tokens/s only covers the time after the first token. With a CachedCompletionListener,
+    completions from the response cache are recorded as such. The measurement is recorded once
+    the stream ends, and the full text is available as .text afterwards.
+    """
+
+    def __init__(self, chunks, kind, stats=None, started=None, listener=None):
+        self.chunks = chunks
+        self.kind = kind
+        self.stats = stats
+        self.started = started
+        self.listener = listener
+        self.text = ""
+        self.time_to_first_token = None
+        self.tokens = 0
+        # Seconds spent generating, from the first token to the end of the stream
+        self.seconds = 0.0
+
+    @property
+    def cached(self):
+        return self.listener is not None and self.listener.cached
+
+    def __iter__(self):
+        start = time.perf_counter() if self.started is None else self.started
+        parts = []
+        try:
+            for chunk in self.chunks:
+                if not chunk:
+                    continue
+                if self.time_to_first_token is None:
+                    self.time_to_first_token = time.perf_counter() - start
+                self.tokens += 1
+                parts.append(chunk)
+                yield chunk
+        finally:
+            self.seconds = time.perf_counter() - start - (self.time_to_first_token or 0.0)
+            self.text = "".join(parts)
+            if self.stats is not None:
+                self.stats.record(
+                    self.kind, self.time_to_first_token, self.tokens, self.seconds,
+                    source="response cache" if self.cached else "model",
+                )
+
+    def describe(self):
+        if self.time_to_first_token is None:
+            return "No tokens generated"
+        if self.cached:
+            return f"Served from the response cache after {self.time_to_first_token:.2f}s"
+        tokens_per_second = self.tokens / self.seconds if self.seconds > 0 else 0.0
+        return f"First token after {self.time_to_first_token:.2f}s · {tokens_per_second:.1f} tokens/s"
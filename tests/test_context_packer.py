@@ -0,0 +1,36 @@
+from langchain.schema import Document
+
+from context_packer import ContextPacker
+
+
+def count_words(text):
+    return len(text.split())
+
+
+def test_row_groups_of_a_sheet_are_not_merged():
+    header = "Sheet: Grades\nName | Grade"
+    first = Document(
+        page_content=f"{header}\nAlice | A\nBob | B",
+        metadata={"name": "grades.xlsx", "sheet": "Grades", "row_start": 2, "row_end": 3, "start_index": 0},
+    )
+    second = Document(
+        page_content=f"{header}\nCarol | C\nDave | D",
+        metadata={"name": "grades.xlsx", "sheet": "Grades", "row_start": 4, "row_end": 5, "start_index": 0},
+    )
+
+    packed = ContextPacker(budget_tokens=1000, token_counter=count_words).pack([first, second])
+
+    text = "\n".join(document.page_content for document in packed)
+    assert len(packed) == 2
+    for row in ("Alice | A", "Bob | B", "Carol | C", "Dave | D"):
+        assert row in text
+
+
+def test_overlapping_chunks_of_a_page_are_merged():
+    page = "First sentence of the page. Second sentence of the page. Third sentence of the page."
+    first = Document(page_content=page[:55], metadata={"name": "notes.pdf", "page": 1, "start_index": 0})
+    second = Document(page_content=page[28:], metadata={"name": "notes.pdf", "page": 1, "start_index": 28})
+
+    packed = ContextPacker(budget_tokens=1000, token_counter=count_words).pack([first, second])
+
+    assert [document.page_content for document in packed] == [page]
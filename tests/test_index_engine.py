@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+import config
+import index_engine
+from exact_vectors import ExactVectorStore
+
+
+DIMENSION = 32
+
+
+@pytest.fixture
+def vectors(monkeypatch):
+    monkeypatch.setattr(config, "PQ_M", 4)
+    monkeypatch.setattr(config, "IVF_NLIST", 16)
+    monkeypatch.setattr(config, "IVF_NPROBE", 16)
+    data = np.random.default_rng(0).standard_normal((1000, DIMENSION)).astype(np.float32)
+    return data / np.linalg.norm(data, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize("quantization", ["none", "fp16", "int8", "pq"])
+@pytest.mark.parametrize("kind", ["flat", "ivf", "hnsw"])
+def test_scoped_search_returns_only_selected_positions(vectors, kind, quantization):
+    index = index_engine.build_index(vectors, kind, quantization=quantization)
+    allowed = np.arange(0, len(vectors), 7)
+
+    distances, labels = index_engine.search_filtered(index, vectors[allowed[:5]], 5, allowed)
+
+    assert labels.shape == (5, 5)
+    hits = labels[labels != -1]
+    assert len(hits)
+    assert np.isin(hits, allowed).all()
+
+
+@pytest.mark.parametrize("quantization", ["none", "fp16", "int8", "pq"])
+def test_excluding_search_never_returns_excluded_positions(vectors, quantization):
+    index = index_engine.build_index(vectors, "flat", quantization=quantization)
+    excluded = np.arange(0, 500)
+
+    distances, labels = index_engine.search_filtered(index, vectors[:3], 10, excluded, exclude=True)
+
+    assert (labels != -1).sum(axis=1).tolist() == [10, 10, 10]
+    assert not np.isin(labels, excluded).any()
+
+
+def test_flat_pq_index_rejects_selector_parameters(vectors):
+    index = index_engine.build_index(vectors, "flat", quantization="pq")
+
+    assert not index_engine.accepts_selector(index)
+    with pytest.raises(ValueError):
+        index_engine.search_parameters(index, selector=index_engine.id_selector([0, 1]))
+
+
+def test_rescoring_pq_candidates_from_exact_store_finds_exact_neighbours(vectors):
+    index = index_engine.build_index(vectors, "flat", quantization="pq")
+    exact_vectors = ExactVectorStore(DIMENSION)
+    exact_vectors.append(vectors)
+    _, truth = index_engine.build_index(vectors, "flat", quantization="none").search(vectors[:20], 1)
+
+    _, candidates = index_engine.search(index, vectors[:20], 40)
+    _, labels = index_engine.rescore(vectors[:20], candidates, exact_vectors, 1)
+
+    assert (labels == truth).all()
+    exact_vectors.close()
+
+
+def test_compacted_store_keeps_rows_in_order(tmp_path, vectors):
+    exact_vectors = ExactVectorStore(DIMENSION, str(tmp_path / "vectors.f32"))
+    exact_vectors.append(vectors[:100])
+    keep = np.arange(0, 100, 3)
+
+    exact_vectors = exact_vectors.replace(exact_vectors.compacted(keep))
+
+    assert np.array_equal(exact_vectors[:], vectors[keep])
+    assert np.array_equal(ExactVectorStore(DIMENSION, str(tmp_path / "vectors.f32"))[:], vectors[keep])
@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+from langchain.schema import Document
+
+import config
+import index_engine
+from embeddings import PendingDocument
+from knowledge_base import KnowledgeBase
+
+
+DIMENSION = 32
+DOCUMENTS = 4
+CHUNKS_PER_DOCUMENT = 250
+
+
+class FixedEmbeddings:
+    """
+    Stands in for the sentence-transformer: the tests search by vector, never by text.
+    """
+
+    def embed_query(self, text):
+        return [0.0] * DIMENSION
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+
+@pytest.fixture
+def vectors():
+    data = np.random.default_rng(0).standard_normal((DOCUMENTS * CHUNKS_PER_DOCUMENT, DIMENSION)).astype(np.float32)
+    return data / np.linalg.norm(data, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def knowledge_base(monkeypatch, vectors):
+    # Index as plain float32 first, so no background promotion races the test
+    monkeypatch.setattr(config, "VECTOR_QUANTIZATION", "none")
+    monkeypatch.setattr(config, "COMPACT_MIN_TOMBSTONES", 10 ** 9)
+    monkeypatch.setattr(config, "PQ_M", 4)
+
+    knowledge_base = KnowledgeBase(FixedEmbeddings())
+    pending = []
+    for d in range(DOCUMENTS):
+        name = f"doc{d}.txt"
+        chunks = [
+            Document(page_content=f"{name} chunk {i}", metadata={"name": name})
+            for i in range(CHUNKS_PER_DOCUMENT)
+        ]
+        rows = vectors[d * CHUNKS_PER_DOCUMENT:(d + 1) * CHUNKS_PER_DOCUMENT]
+        pending.append(PendingDocument(Document(page_content="", metadata={"name": name}), chunks, name, rows.tolist()))
+    knowledge_base.add_documents(pending)
+    return knowledge_base
+
+
+def quantize(knowledge_base, monkeypatch, quantization):
+    monkeypatch.setattr(config, "VECTOR_QUANTIZATION", quantization)
+    knowledge_base.promote()
+    assert index_engine.quantization(knowledge_base.vectorstore.index) == quantization
+
+
+@pytest.mark.parametrize("quantization", ["fp16", "int8", "pq"])
+def test_search_after_delete_on_quantized_flat_index(knowledge_base, monkeypatch, vectors, quantization):
+    quantize(knowledge_base, monkeypatch, quantization)
+
+    knowledge_base.delete_document("doc0.txt")
+    results = knowledge_base.search_by_vector(vectors[0].tolist(), 5)
+
+    assert len(results) == 5
+    assert all(chunk.metadata["name"] != "doc0.txt" for _, chunk, _ in results)
+
+
+@pytest.mark.parametrize("quantization", ["fp16", "int8", "pq"])
+def test_scoped_search_on_quantized_flat_index(knowledge_base, monkeypatch, vectors, quantization):
+    quantize(knowledge_base, monkeypatch, quantization)
+
+    results = knowledge_base.search_by_vector(vectors[0].tolist(), 5, scope={"names": ["doc2.txt"]})
+
+    assert len(results) == 5
+    assert all(chunk.metadata["name"] == "doc2.txt" for _, chunk, _ in results)
+
+
+def test_promotion_and_compaction_rebuild_from_exact_vectors(knowledge_base, monkeypatch, vectors):
+    quantize(knowledge_base, monkeypatch, "int8")
+    knowledge_base.delete_document("doc0.txt")
+    knowledge_base.compact()
+
+    kept = vectors[CHUNKS_PER_DOCUMENT:]
+    assert np.array_equal(knowledge_base.exact_vectors[:], kept)
+    assert knowledge_base.vectorstore.index.ntotal == len(kept)
+
+
+def test_rescoring_ranks_quantized_candidates_exactly(knowledge_base, monkeypatch, vectors):
+    monkeypatch.setattr(config, "RESCORE", True)
+    quantize(knowledge_base, monkeypatch, "pq")
+
+    results = knowledge_base.search_by_vectors(vectors[:10].tolist(), 1)
+
+    assert [chunk.page_content for ((_, chunk, _),) in results] == [f"doc0.txt chunk {i}" for i in range(10)]
+    assert knowledge_base.index_stats()["rescore"]
@@ -14,6 +14,7 @@ from langchain.chains import LLMChain
 from langchain.prompts import PromptTemplate
 from langchain.chains.question_answering import load_qa_chain
 from langchain.llms import Ollama
+import generation
 import os
 import tempfile
 from collections import Counter
@@ -24,7 +25,7 @@ st.set_page_config(page_title="Corporate Training Knowledge Hub", layout="wide")
 st.title("Corporate Training Knowledge Hub")
 
 # <------------------------------------Initialize components------------------------------------->
-llm = Ollama(model="llama3.2")  # Replace with your Llama model
+llm = generation.get_llm()
 embedding_model = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
 vectorstore = None
 document_store = []
@@ -0,0 +1,159 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import config
+from ingestion import IngestionWorker
+from knowledge_base import KnowledgeBase
+from query_cache import SemanticAnswerCache
+
+
+def workspace_name(text):
+    """
+    Turns user input into a safe directory name; empty input means the default workspace.
+    """
+    name = re.sub(r"[^A-Za-z0-9_-]+", "-", (text or "").strip()).strip("-")
+    return name or config.DEFAULT_WORKSPACE
+
+
+# <--------------------------------------------------Workspace------------------------------------->
+class Workspace:
+    """
+    One team's or session's isolated corpus: its knowledge base, ingestion worker, semantic
+    answer cache and QA engine. Nothing in it is shared with other workspaces.
+    """
+
+    def __init__(self, name, data_dir, embedding_model, embedding_cache):
+        self.name = name
+        self.data_dir = data_dir
+        self.knowledge_base = KnowledgeBase(embedding_model, data_dir)
+        self.knowledge_base.load()
+        self.ingestion_worker = IngestionWorker(self.knowledge_base, embedding_model, embedding_cache)
+        self.answer_cache = SemanticAnswerCache()
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+        self._qa_engine = None
+        self._qa_engine_version = None
+
+    def qa_engine(self, build):
+        """
+        Returns the QA engine for the current index version, calling build(knowledge_base)
+        to create it once per version.
+        """
+        with self.lock:
+            version = self.knowledge_base.version
+            if self._qa_engine is None or self._qa_engine_version != version:
+                self._qa_engine = build(self.knowledge_base)
+                self._qa_engine_version = version
+            return self._qa_engine
+
+    def memory_bytes(self):
+        return self.knowledge_base.memory_bytes()
+
+    def is_busy(self):
+        """
+        Returns True while uploads are being indexed or the index is being compacted/promoted.
+        """
+        return bool(self.ingestion_worker.active_jobs()) or self.knowledge_base.maintaining
+
+    def close(self):
+        self.knowledge_base.save()
+        self.ingestion_worker.stop()
+
+
+# <--------------------------------------------------Workspace pool------------------------------------->
+class WorkspacePool:
+    """
+    Keeps recently queried workspaces loaded and the rest on disk. Whenever the estimated
+    memory of the loaded workspaces exceeds the budget, the least recently queried idle ones
+    are saved and unloaded; they are loaded from disk again on their next query (IVF lists
+    memory-mapped, flat and HNSW indexes read back into RAM).
+
+    A workspace held by a live session is never unloaded, since that session keeps using its
+    knowledge base and ingestion worker: get(name, holder) records the holder (e.g. a session
+    id) as holding that workspace until it gets another one or session_alive(holder) turns
+    False. Without session_alive, holders only release a workspace by switching.
+    """
+
+    def __init__(self, embedding_model, embedding_cache, root_dir=None, memory_budget=None, session_alive=None):
+        self.embedding_model = embedding_model
+        self.embedding_cache = embedding_cache
+        self.root_dir = root_dir or config.DATA_DIR
+        self.memory_budget = memory_budget or config.WORKSPACE_MEMORY_BUDGET_BYTES
+        self.session_alive = session_alive
+        # name -> Workspace, least recently used first
+        self.loaded = OrderedDict()
+        # holder -> name of the workspace it holds
+        self.holders = {}
+        self.lock = threading.Lock()
+
+    def data_dir(self, name):
+        # The default workspace keeps using the data directory indexes were saved to before workspaces
+        if name == config.DEFAULT_WORKSPACE:
+            return self.root_dir
+        return os.path.join(self.root_dir, "workspaces", name)
+
+    def get(self, name, holder=None):
+        """
+        Returns the workspace, loading it from disk if needed, and marks it most recently used.
+        With a holder, it stays loaded while that holder holds it.
+        """
+        with self.lock:
+            if holder is not None:
+                self.holders[holder] = name
+            workspace = self.loaded.get(name)
+            if workspace is None:
+                workspace = Workspace(name, self.data_dir(name), self.embedding_model, self.embedding_cache)
+                self.loaded[name] = workspace
+            self.loaded.move_to_end(name)
+            workspace.last_used = time.monotonic()
+            self._evict(keep=name)
+            return workspace
+
+    def names(self):
+        """
+        Returns every workspace known on disk or loaded.
+        """
+        names = {config.DEFAULT_WORKSPACE}
+        workspaces_dir = os.path.join(self.root_dir, "workspaces")
+        if os.path.isdir(workspaces_dir):
+            names.update(os.listdir(workspaces_dir))
+        with self.lock:
+            names.update(self.loaded)
+        return sorted(names)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "loaded": list(self.loaded),
+                "memory_bytes": sum(workspace.memory_bytes() for workspace in self.loaded.values()),
+                "budget_bytes": self.memory_budget,
+            }
+
+    def _held(self):
+        """
+        Returns the names of workspaces held by live holders, forgetting ended sessions.
+        """
+        if self.session_alive is not None:
+            for holder in [holder for holder in self.holders if not self.session_alive(holder)]:
+                del self.holders[holder]
+        return set(self.holders.values())
+
+    def _evict(self, keep):
+        total = sum(workspace.memory_bytes() for workspace in self.loaded.values())
+        if total <= self.memory_budget:
+            return
+        held = self._held()
+        for name in list(self.loaded):
+            if total <= self.memory_budget:
+                break
+            workspace = self.loaded[name]
+            # Held workspaces are still in use by their sessions; busy ones stay loaded so
+            # their jobs and maintenance can finish
+            if name == keep or name in held or workspace.is_busy():
+                continue
+            total -= workspace.memory_bytes()
+            workspace.close()
+            del self.loaded[name]